@@ -1,18 +1,20 @@
 # app.py
 import streamlit as st
-import time
+import asyncio
+import threading
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import pydeck as pdk
-from plotly.subplots import make_subplots
 
 # 引入自定义核心模块
 from config import *
-from core import PrivacyModule, TruthDiscovery, StabilityAnalyzer, CareDecision
+from core.engine import CareEngine, single_resident_source
+from core.async_pipeline import AsyncCarePipeline
+from core.instrumentation import INSTRUMENTATION
 from core.nlp_bert import BertSemanticAnalyzer
 from simulation import RealTimeSimulator
 from simulation.actors import UserProfile
+from utils.dashboard import RefreshThrottle, CachedMarkdown, DualAxisChart, PrivacyMap
+from utils.timeseries import TimeSeriesStore
 
 # ============================
 # 1. 页面配置与样式 (Cyberpunk UI)
@@ -115,6 +117,25 @@ with col_b2:
 st.sidebar.markdown("---")
 st.sidebar.header("4. 志愿者语义注入")
 manual_crowd_text = st.sidebar.text_input("志愿者描述 (BERT)", placeholder="e.g. He looks dizzy")
+privacy_ph = st.sidebar.empty() # 隐私保护视图 (原地重绘，不再每帧新增 Expander)
+
+# --- 2.5 性能监测 (分阶段埋点 / 采样分析器，运行时开关) ---
+st.sidebar.markdown("---")
+st.sidebar.header("5. 性能监测")
+if st.sidebar.toggle("分阶段延迟埋点", value=INSTRUMENTATION.enabled):
+    INSTRUMENTATION.enable()
+    if INSTRUMENTATION.serve(port=INSTRUMENTATION_PORT) is not None:
+        st.sidebar.caption(f"抓取: http://127.0.0.1:{INSTRUMENTATION_PORT}/metrics (JSON: /metrics.json)")
+    else:
+        st.sidebar.warning(f"导出端点未启动: {INSTRUMENTATION.server_error}")
+else:
+    INSTRUMENTATION.disable()
+if st.sidebar.toggle("采样分析器", value=False):
+    # Streamlit 脚本运行在工作线程中，采样当前线程
+    INSTRUMENTATION.start_profiler(thread_id=threading.get_ident())
+else:
+    INSTRUMENTATION.stop_profiler()
+perf_ph = CachedMarkdown(st.sidebar.empty())
 
 # ============================
 # 3. 主界面布局
@@ -149,6 +170,7 @@ st.markdown("---")
 # --- 3.4 图表与地图 ---
 row3_c1, row3_c2 = st.columns([2, 1])
 with row3_c1:
+    chart_range = st.radio("时间范围", list(CHART_RANGES), horizontal=True, label_visibility="collapsed")
     tab1, tab2 = st.tabs(["📈 循环系统 (HR/BP/SpO2)", "⚡ 神经系统 (GSR/Pain)"])
     with tab1: chart_cardio = st.empty()
     with tab2: chart_neuro = st.empty()
@@ -163,7 +185,7 @@ log_ph = st.empty()
 # ============================
 # 4. 辅助渲染函数
 # ============================
-def render_metric(placeholder, label, value, unit, level="low"):
+def render_metric(card, label, value, unit, level="low"):
     color_map = {"low": "val-low", "mid": "val-mid", "high": "val-high"}
     color_class = color_map.get(level, "val-low")
     
@@ -174,7 +196,7 @@ def render_metric(placeholder, label, value, unit, level="low"):
         <div class="metric-unit">{unit}</div>
     </div>
     """
-    placeholder.markdown(html, unsafe_allow_html=True)
+    card.markdown(html) # CachedMarkdown: 内容不变时不重绘
 
 # ============================
 # 5. 仿真主循环 (状态持久化 + BERT缓存)
@@ -182,192 +204,170 @@ def render_metric(placeholder, label, value, unit, level="low"):
 if st.session_state.running:
     
     # --- 初始化核心模块 ---
+    # 隐私 -> 稳定性 -> 真值发现 -> 决策 -> 中断 的完整流程由无界面引擎执行，UI 只负责渲染
     sim = RealTimeSimulator()
-    privacy = PrivacyModule(k=k_val)
-    truth = TruthDiscovery(sensitivity=kl_lam)
-    stability = StabilityAnalyzer()
-    decision = CareDecision()
+    base_lat, base_lon = 31.939, 118.790
+    engine = CareEngine(
+        1, profiles=[current_profile], coords=[[base_lat, base_lon]],
+        k=k_val, sensitivity=kl_lam, threshold=ent_th
+    )
+    engine.set_sos(0, is_sos_btn)
     
-    # 缓存加载 BERT
+    # 加载 BERT (进程级注册表缓存，页面刷新不会重复加载)
     with st.spinner("正在加载 BERT 认知模型..."):
         bert_engine = BertSemanticAnalyzer()
+        bert_engine.warmup()
     
     # 数据容器
-    hist = {k: [] for k in ['time','hr','sys','dia','spo2','gsr','score','entropy']}
+    hist = TimeSeriesStore(['time','hr','sys','dia','spo2','gsr','score','entropy'])
     logs = []
-    base_lat, base_lon = 31.939, 118.790
     
-    stream = sim.stream_generator(selected_scenario_key)
+    stream = single_resident_source(sim.stream_generator(selected_scenario_key))
 
-    # --- 状态缓存 (BERT 防抖动) ---
-    last_crowd_text = None
-    cached_crowd_dist = None
-    last_self_text = None
-    cached_voice_penalty = 0.0
-    cached_voice_interrupt = False
-    
-    # --- 实时数据流循环 ---
-    for state, t in stream:
-        
-        # 1. 覆盖基准分 ($D_{prof}$)
-        state.base_score = current_profile.base_score
-        
-        # 2. BERT 语义感知 (带缓存)
-        
-        # A. 志愿者通道
-        current_crowd_dist = None
-        if manual_crowd_text:
-            if manual_crowd_text != last_crowd_text:
-                cached_crowd_dist = bert_engine.predict_crowd_distribution(manual_crowd_text)
-                st.toast(f"BERT解析志愿者: Risk Probability: {cached_crowd_dist[1]:.2f}", icon="🤖")
-                last_crowd_text = manual_crowd_text
-            current_crowd_dist = cached_crowd_dist
+    # --- 语义输入 (BERT 在后台任务中推理，不阻塞时钟) ---
+    def on_semantic(resident, kind, text, value):
+        if kind == "crowd":
+            st.toast(f"BERT解析志愿者: Risk Probability: {value[1]:.2f}", icon="🤖")
         else:
-            last_crowd_text = None
-            cached_crowd_dist = None
-            
-        # B. 老人自述通道
-        if self_voice_text:
-            if self_voice_text != last_self_text:
-                cached_voice_penalty, cached_voice_interrupt = bert_engine.predict_self_score(self_voice_text)
-                st.toast(f"BERT解析语音: 罚分={cached_voice_penalty:.1f}, 中断={cached_voice_interrupt}", icon="🗣️")
-                last_self_text = self_voice_text
-        else:
-            last_self_text = None
-            cached_voice_penalty = 0.0
-            cached_voice_interrupt = False
-
-        # 3. 算法计算
-        
-        # A. 隐私保护 (升级版: 全栈脱敏)
-        # 传入当前的 system level，如果已经是L4，自动降级隐私保护
-        # 注意: 这里我们在计算 score 之前就需要知道 level，这在逻辑上是个闭环。
-        # 工程上通常取“上一帧的 level”或者预判断。这里我们使用当前计算出的 level (先算后脱敏) 或者简单处理。
-        # 为了演示效果，我们先按 L3 算隐私，如果触发中断则在日志里显示隐私“破碎”。
-        
-        # 调用新接口获取脱敏包
-        sanitized_pkg = privacy.apply_privacy_policy(
-            current_profile, base_lat, base_lon, system_level=level
-        )
-        bbox = sanitized_pkg['bbox'] # 用于地图绘图
+            st.toast(f"BERT解析语音: 罚分={value[0]:.1f}, 中断={value[1]}", icon="🗣️")
+    
+    pipeline = AsyncCarePipeline(engine, stream, analyzer=bert_engine, tick_interval=0.3, on_semantic=on_semantic)
+    pipeline.submit_crowd_text(0, manual_crowd_text)
+    pipeline.submit_voice_text(0, self_voice_text)
+    
+    # --- 渲染器: 图表与地图对象只创建一次，之后增量更新 ---
+    ui_throttle = RefreshThrottle(max_fps=UI_MAX_FPS)
+    chart_c = DualAxisChart(chart_cardio, [
+        dict(name='HR', line=dict(color='#00BFFF', width=2)),
+        dict(name='Sys BP', line=dict(color='#FF4444', width=1, dash='dot'), secondary_y=True),
+    ])
+    chart_n = DualAxisChart(chart_neuro, [
+        dict(name='GSR (Pain)', fill='tozeroy', line=dict(color='#FFA500')),
+        dict(name='Score', line=dict(color='#00FF00', dash='dash'), secondary_y=True),
+    ])
+    privacy_map = PrivacyMap(map_ph, base_lat, base_lon)
+    card_status = CachedMarkdown(ph_status)
+    cards = {ph: CachedMarkdown(ph) for ph in [m_hr, m_bp, m_spo2, m_resp, m_temp, m_gsr]}
+    ui = {"privacy_view": None, "logs_dirty": False}
+    if is_sos_btn: st.toast("物理 SOS 按键触发！", icon="🚨")
+    
+    # --- 渲染任务: 消费引擎结果流 ---
+    def render(result, staleness):
+        state = result.states[0] # 单人行视图 (与 HolographicState 属性一致)
+        t = result.t
         
-        # [新增] 在侧边栏或Expander展示隐私数据对比 (非常直观)
-        with st.sidebar.expander("🔒 隐私保护视图 (Data View)", expanded=False):
-            st.write("**原始数据 (Raw)**")
-            st.json({
-                "Name": current_profile.name,
-                "Age": current_profile.age,
-                "Condition": current_profile.condition,
-                "Loc": f"{base_lat:.4f}, {base_lon:.4f}"
-            })
-            st.write(f"**发布数据 (Public - {sanitized_pkg['privacy_mode']})**")
-            st.json({
-                "Name": sanitized_pkg['uid'],
-                "Age": sanitized_pkg['age_group'],
-                "Cond": sanitized_pkg['condition_category'], # 这里展示 Level 1
-                "K-Val": sanitized_pkg['k_level']
-            })
+        entropy = float(result.entropy[0])
+        conf = float(result.confidence[0])
+        score = float(result.score[0])
+        level = LEVELS[result.level[0]]
+        changed = bool(result.changed[0])
+        semantic_lag = max(staleness["crowd_lag_s"][0], staleness["voice_lag_s"][0])
         
-        # B. 稳定性
-        entropy, ent_pen = stability.update_and_calculate(state.hr)
+        # 1. 记录历史与日志 (每帧)
+        hist.append(time=t, hr=state.hr, sys=state.bp_sys, dia=state.bp_dia, spo2=state.spo2,
+                    gsr=state.gsr, score=score, entropy=entropy)
         
-        # C. 真值发现 (BERT 增强)
-        if current_crowd_dist is not None:
-            conf, _ = truth.compute_trust_with_distribution(state.hr, current_crowd_dist)
-        else:
-            conf, _ = truth.compute_trust_score(state.hr, state.crowd_labels)
+        if changed or state.shock or score < 70 or state.gsr > 10:
+            icon = "🔴" if level == "L4" else "⚠️"
+            extra = []
+            if state.bp_sys > 150: extra.append(f"BP:{int(state.bp_sys)}")
+            if state.gsr > 10: extra.append(f"PAIN:{state.gsr:.1f}")
+            if state.shock: extra.append("FALL!")
+            if is_sos_btn: extra.append("SOS_BTN")
+            if engine.voice_interrupt[0]: extra.append("VOICE_SOS")
             
-        # D. 决策 (融合语音罚分)
-        total_penalty_input = ent_pen + cached_voice_penalty
-        score, level, changed = decision.evaluate(state, conf, total_penalty_input)
+            msg = f"{icon} T={t} | {level} | {state.location} | Score:{score:.1f} | {' '.join(extra)}"
+            logs.insert(0, msg)
+            del logs[8:]
+            ui["logs_dirty"] = True
         
-        # E. 高优中断 ($D_{self}$)
-        # 注意：即使点击按钮导致重运行，is_sos_btn 在该帧仍为 True
-        if is_sos_btn or cached_voice_interrupt:
-            level = "L4"
-            score = 0.0
-            changed = True
-            if is_sos_btn: st.toast("物理 SOS 按键触发！", icon="🚨")
+        # 2. UI 渲染 (按 UI_MAX_FPS 节流，与仿真时钟解耦；等级切换时立即刷新)
+        if not ui_throttle.due(force=changed):
+            return
         
-        # 4. 记录历史
-        for k, v in zip(hist.keys(), [t, state.hr, state.bp_sys, state.bp_dia, state.spo2, state.gsr, score, entropy]):
-            hist[k].append(v)
+        # 脱敏数据包
+        sanitized_pkg = result.packets[0]
         
-        if len(hist['time']) > 60:
-            for k in hist: hist[k].pop(0)
-            
-        # 5. UI 渲染
+        # [新增] 在侧边栏展示隐私数据对比 (非常直观)，发布内容变化时才重绘
+        public_view = {
+            "Name": sanitized_pkg['uid'],
+            "Age": sanitized_pkg['age_group'],
+            "Cond": sanitized_pkg['condition_category'], # 这里展示 Level 1
+            "K-Val": sanitized_pkg['k_level']
+        }
+        if (sanitized_pkg['privacy_mode'], public_view) != ui["privacy_view"]:
+            ui["privacy_view"] = (sanitized_pkg['privacy_mode'], public_view)
+            with privacy_ph.container():
+                with st.expander("🔒 隐私保护视图 (Data View)", expanded=False):
+                    st.write("**原始数据 (Raw)**")
+                    st.json({
+                        "Name": current_profile.name,
+                        "Age": current_profile.age,
+                        "Condition": current_profile.condition,
+                        "Loc": f"{base_lat:.4f}, {base_lon:.4f}"
+                    })
+                    st.write(f"**发布数据 (Public - {sanitized_pkg['privacy_mode']})**")
+                    st.json(public_view)
         
         # 顶部状态
         st_class = "status-normal" if level == "L3" else "status-alert"
-        ph_status.markdown(f"""
+        card_status.markdown(f"""
         <div class="metric-card" style="padding:5px;">
             <div class="metric-label">SYSTEM LEVEL</div>
             <div class="{st_class}" style="font-size:32px; font-weight:bold;">{level}</div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
         
         ph_score.metric("AI 综合评分", f"{score:.1f}", delta=f"{score-state.base_score:.1f}")
-        ph_trust.metric("群智置信度", f"{conf:.2f}")
+        ph_trust.metric("群智置信度", f"{conf:.2f}",
+                        delta=f"语义推理中 {semantic_lag:.1f}s" if semantic_lag > 0 else None, delta_color="off")
         
         # 指标卡片
         hr_lvl = "high" if state.hr > 110 or state.hr < 50 else "mid" if state.hr > 100 else "low"
-        render_metric(m_hr, "HEART RATE", int(state.hr), "BPM", hr_lvl)
+        render_metric(cards[m_hr], "HEART RATE", int(state.hr), "BPM", hr_lvl)
         
         bp_lvl = "high" if state.bp_sys > 150 or state.bp_sys < 90 else "low"
-        render_metric(m_bp, "BP (SYS/DIA)", f"{int(state.bp_sys)}/{int(state.bp_dia)}", "mmHg", bp_lvl)
+        render_metric(cards[m_bp], "BP (SYS/DIA)", f"{int(state.bp_sys)}/{int(state.bp_dia)}", "mmHg", bp_lvl)
         
         spo2_lvl = "high" if state.spo2 < 90 else "mid" if state.spo2 < 95 else "low"
-        render_metric(m_spo2, "SpO2", int(state.spo2), "%", spo2_lvl)
+        render_metric(cards[m_spo2], "SpO2", int(state.spo2), "%", spo2_lvl)
         
         rr_lvl = "high" if state.resp_rate > 25 else "low"
-        render_metric(m_resp, "RESP RATE", int(state.resp_rate), "RPM", rr_lvl)
+        render_metric(cards[m_resp], "RESP RATE", int(state.resp_rate), "RPM", rr_lvl)
         
         temp_lvl = "mid" if state.temp > 37.5 else "low"
-        render_metric(m_temp, "TEMP", f"{state.temp:.1f}", "°C", temp_lvl)
+        render_metric(cards[m_temp], "TEMP", f"{state.temp:.1f}", "°C", temp_lvl)
         
         gsr_lvl = "high" if state.gsr > 8.0 else "low"
-        render_metric(m_gsr, "GSR (PAIN)", f"{state.gsr:.1f}", "µS", gsr_lvl)
+        render_metric(cards[m_gsr], "GSR (PAIN)", f"{state.gsr:.1f}", "µS", gsr_lvl)
         
-        # 图表 (Tab 1)
-        fig_c = make_subplots(specs=[[{"secondary_y": True}]])
-        fig_c.add_trace(go.Scatter(x=hist['time'], y=hist['hr'], name='HR', line=dict(color='#00BFFF', width=2)), secondary_y=False)
-        fig_c.add_trace(go.Scatter(x=hist['time'], y=hist['sys'], name='Sys BP', line=dict(color='#FF4444', width=1, dash='dot')), secondary_y=True)
-        fig_c.update_layout(height=280, margin=dict(l=0,r=0,t=10,b=0), template="plotly_dark", legend=dict(orientation="h", y=1.1))
-        chart_cardio.plotly_chart(fig_c, use_container_width=True)
+        # 图表 (Tab 1 / Tab 2)
+        span = CHART_RANGES[chart_range]
+        if span <= CHART_WINDOW:
+            w = lambda k: hist.window(k, span) # 零拷贝窗口视图
+        else:
+            # 长时间范围: 超出原始层容量时改用能覆盖该范围的汇总层 (桶均值，含未满的当前桶)
+            w = lambda k: hist.series(k, span)["mean"]
+        chart_c.update(w('time'), [w('hr'), w('sys')])
+        chart_n.update(w('time'), [w('gsr'), w('score')])
         
-        # 图表 (Tab 2)
-        fig_n = make_subplots(specs=[[{"secondary_y": True}]])
-        fig_n.add_trace(go.Scatter(x=hist['time'], y=hist['gsr'], name='GSR (Pain)', fill='tozeroy', line=dict(color='#FFA500')), secondary_y=False)
-        fig_n.add_trace(go.Scatter(x=hist['time'], y=hist['score'], name='Score', line=dict(color='#00FF00', dash='dash')), secondary_y=True)
-        fig_n.update_layout(height=280, margin=dict(l=0,r=0,t=10,b=0), template="plotly_dark", legend=dict(orientation="h", y=1.1))
-        chart_neuro.plotly_chart(fig_n, use_container_width=True)
+        # 地图 (隐私框变化时才重绘)
+        privacy_map.update(sanitized_pkg['bbox'])
         
-        # 地图
-        box_coords = [[
-            [bbox[0], bbox[1]], [bbox[2], bbox[1]], 
-            [bbox[2], bbox[3]], [bbox[0], bbox[3]],
-            [bbox[0], bbox[1]]
-        ]]
-        layer_box = pdk.Layer("PolygonLayer", data=[{"coords": box_coords}], get_polygon="coords", get_fill_color=[0, 255, 100, 30], get_line_color=[0, 255, 100, 200], get_line_width=3)
-        layer_pt = pdk.Layer("ScatterplotLayer", data=[{"lat": base_lat, "lon": base_lon}], get_position="[lon, lat]", get_color=[255, 0, 0, 200], get_radius=20)
-        view_state = pdk.ViewState(latitude=base_lat, longitude=base_lon, zoom=14.5, pitch=30)
-        map_ph.pydeck_chart(pdk.Deck(layers=[layer_box, layer_pt], initial_view_state=view_state, map_style="dark"))
+        # 性能监测 (各阶段 p50 / p99)
+        if INSTRUMENTATION.enabled:
+            stages = INSTRUMENTATION.snapshot()["stages"]
+            perf_ph.markdown("<br>".join(
+                f"<code>{name:<10} p50 {h['p50_s']*1e3:7.2f} ms | p99 {h['p99_s']*1e3:7.2f} ms</code>"
+                for name, h in stages.items()
+            ))
         
         # 日志
-        if changed or state.shock or score < 70 or state.gsr > 10:
-            icon = "🔴" if level == "L4" else "⚠️"
-            extra = []
-            if state.bp_sys > 150: extra.append(f"BP:{int(state.bp_sys)}")
-            if state.gsr > 10: extra.append(f"PAIN:{state.gsr:.1f}")
-            if state.shock: extra.append("FALL!")
-            if is_sos_btn: extra.append("SOS_BTN")
-            if cached_voice_interrupt: extra.append("VOICE_SOS")
-            
-            msg = f"{icon} T={t} | {level} | {state.location} | Score:{score:.1f} | {' '.join(extra)}"
-            logs.insert(0, msg)
-            log_ph.text_area("System Logs", "\n".join(logs[:8]), height=150)
-            
-        time.sleep(0.3)
+        if ui["logs_dirty"]:
+            log_ph.text_area("System Logs", "\n".join(logs), height=150)
+            ui["logs_dirty"] = False
+    
+    # 时钟 (0.3s/帧)、语义推理、渲染三个任务并发运行
+    asyncio.run(pipeline.run(render))
 else:
     st.info("👋 请在侧边栏点击【🚀 启动系统】开始实时仿真")
\ No newline at end of file
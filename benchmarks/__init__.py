@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# 性能/一致性基准脚本 (python -m benchmarks.<name> 运行)
@@ -0,0 +1,126 @@
+# benchmarks/bert_backends.py
+"""
+BERT 推理后端一致性与性能对比
+以 fp32 pipeline 为基准，在固定的志愿者/自述短语集上检查 int8 / onnx 后端的输出一致性，
+并报告加载耗时、单条延迟 (均值 / p95) 与常驻内存增量
+
+用法: python -m benchmarks.bert_backends --model-path ./models/distilbart-mnli-12-1 --backends int8 onnx
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+
+CROWD_PHRASES = [
+    "He fell down in the bathroom", "She looks dizzy", "He is walking normally",
+    "He is stumbling and holding the wall", "She is lying on the floor", "Everything looks fine",
+    "He seems confused and pale", "She is sitting and reading",
+]
+SELF_PHRASES = [
+    "My chest hurts", "I feel good", "Help me, I can't breathe", "My knee is a bit sore",
+    "I am fine, thank you", "I fell and can't get up", "I have a terrible headache", "Call the doctor now",
+]
+
+
+def _rss_mb():
+    """当前进程常驻内存 (MB)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _measure(backend, model_path, num_threads, repeats):
+    """在独立子进程中加载后端并测量 (避免多个模型共存影响内存统计)"""
+    from core.nlp_bert import BertSemanticAnalyzer
+
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    analyzer = BertSemanticAnalyzer(cache_size=0, backend=backend, model_path=model_path, num_threads=num_threads)
+    analyzer.warmup()
+    load_s = time.perf_counter() - t0
+
+    crowd, selfs, latencies = [], [], []
+    for _ in range(repeats):
+        crowd, selfs = [], []
+        for text in CROWD_PHRASES:
+            t0 = time.perf_counter()
+            crowd.append(analyzer.predict_crowd_distribution(text).tolist())
+            latencies.append(time.perf_counter() - t0)
+        for text in SELF_PHRASES:
+            t0 = time.perf_counter()
+            selfs.append([float(v) for v in analyzer.predict_self_score(text)])
+            latencies.append(time.perf_counter() - t0)
+
+    lat = np.array(latencies) * 1000.0
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "rss_mb": _rss_mb() - rss0,
+        "latency_mean_ms": float(lat.mean()),
+        "latency_p95_ms": float(np.percentile(lat, 95)),
+        "crowd": crowd,
+        "self": selfs,
+    }
+
+
+def _parity(ref, res):
+    ref_q, res_q = np.array(ref["crowd"]), np.array(res["crowd"])
+    ref_s, res_s = np.array(ref["self"]), np.array(res["self"])
+    return {
+        "crowd_top1_agreement": float(np.mean(ref_q.argmax(1) == res_q.argmax(1))),
+        "crowd_max_abs_diff": float(np.abs(ref_q - res_q).max()),
+        "self_penalty_max_abs_diff": float(np.abs(ref_s[:, 0] - res_s[:, 0]).max()),
+        "self_interrupt_agreement": float(np.mean(ref_s[:, 1] == res_s[:, 1])),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BERT 推理后端一致性与性能对比")
+    parser.add_argument("--model-path", required=True, help="本地模型目录 (离线加载)")
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="top-1 标签一致率下限")
+    parser.add_argument("--max-diff", type=float, default=0.05, help="分布逐项最大偏差上限")
+    parser.add_argument("--json", help="将完整报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    results = []
+    ctx = mp.get_context("spawn")
+    for backend in ["pytorch"] + [b for b in args.backends if b != "pytorch"]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results.append(pool.submit(_measure, backend, args.model_path, args.threads, args.repeats).result())
+
+    ref = results[0]
+    ok = True
+    print(f"{'backend':<10}{'load(s)':>9}{'RSS(MB)':>10}{'mean(ms)':>10}{'p95(ms)':>10}"
+          f"{'top1':>7}{'maxΔQ':>9}{'maxΔpen':>9}{'intr':>6}")
+    for res in results:
+        res["parity"] = _parity(ref, res)
+        p = res["parity"]
+        passed = (p["crowd_top1_agreement"] >= args.min_agreement and p["crowd_max_abs_diff"] <= args.max_diff
+                  and p["self_interrupt_agreement"] == 1.0)
+        ok &= passed
+        print(f"{res['backend']:<10}{res['load_s']:>9.2f}{res['rss_mb']:>10.1f}{res['latency_mean_ms']:>10.2f}"
+              f"{res['latency_p95_ms']:>10.2f}{p['crowd_top1_agreement']:>7.2f}{p['crowd_max_abs_diff']:>9.4f}"
+              f"{p['self_penalty_max_abs_diff']:>9.3f}{p['self_interrupt_agreement']:>6.2f}"
+              f"{'' if passed else '  <-- PARITY FAIL'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
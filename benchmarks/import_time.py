@@ -0,0 +1,67 @@
+# benchmarks/import_time.py
+"""
+导入耗时守护: 核心包必须在毫秒级完成导入，且不能引入 Streamlit / Transformers / Torch
+在全新子进程中测量 (先导入 numpy，单独统计核心包自身耗时)，超出预算或出现重依赖时返回非零
+
+用法: python -m benchmarks.import_time [--budget-ms 100]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULES = ["config", "core", "core.nlp_bert", "core.nlp_batching", "simulation"]
+FORBIDDEN = ["streamlit", "transformers", "torch", "onnxruntime"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import numpy
+t1 = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+t2 = time.perf_counter()
+print(json.dumps({{
+    "numpy_ms": (t1 - t0) * 1000.0,
+    "core_ms": (t2 - t1) * 1000.0,
+    "heavy": [m for m in {forbidden!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(repeats=5):
+    """多次冷启动取最小值 (排除磁盘缓存等偶发抖动)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = _PROBE.format(modules=MODULES, forbidden=FORBIDDEN)
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "numpy_ms": min(r["numpy_ms"] for r in runs),
+        "core_ms": min(r["core_ms"] for r in runs),
+        "heavy": sorted({m for r in runs for m in r["heavy"]}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="核心包导入耗时守护")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="核心包 (不含 numpy) 导入耗时上限")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    res = measure(args.repeats)
+    print(f"numpy: {res['numpy_ms']:.1f} ms | core: {res['core_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if res["heavy"]:
+        print(f"FAIL: 导入核心包时加载了重依赖: {', '.join(res['heavy'])}")
+        return 1
+    if res["core_ms"] > args.budget_ms:
+        print("FAIL: 导入耗时超出预算")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+# benchmarks/modules.py
+"""
+核心模块逐时刻开销基准
+- 单次调用延迟: StabilityAnalyzer / TruthDiscovery / CareDecision / PrivacyModule / RealTimeSimulator 的逐人接口
+- 批量吞吐: 对应的群体接口 (batch_entropy、compute_trust_batch、PopulationDecision、sanitize_population、
+  cloak_population、PopulationSimulator、CareEngine.step) 在多个社区规模下的每秒处理人数；
+  带 [seeded] 后缀的项为给定 seed 的逐人随机流路径，其余为默认的整体向量化路径
+- BERT: 使用本地小模型目录 (--model-path) 代替正式模型，关闭语义缓存，测单条与批量推理
+
+结果写为 JSON；给定 --baseline 时与基线逐项比较，延迟变慢超过阈值即判为回归 (返回非零)
+
+用法: python -m benchmarks.modules --sizes 100 1000 10000 --out bench.json --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from .bert_backends import CROWD_PHRASES, SELF_PHRASES
+
+MODULES = ("stability", "truth", "decision", "privacy", "simulator", "engine", "bert")
+
+
+def _time_call(fn, min_time=0.2, repeat=5):
+    """自动确定循环次数，返回 repeat 次测量中每次调用耗时 (秒) 的最小值 (与 timeit 相同，受调度抖动影响最小)"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time / repeat:
+            break
+        loops *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return float(min(samples))
+
+
+def _population(n, seed=0):
+    from simulation import PopulationSimulator, HolographicColumns
+    batch = PopulationSimulator(n, list(PopulationSimulator.SCENARIOS) * (n // 6) +
+                                ["Normal"] * (n % 6), seed=seed).generate(30)
+    return HolographicColumns.from_batch(batch, 29)
+
+
+def _profiles(n):
+    from simulation.actors import UserProfile
+    pool = [("张三", 65, "Healthy"), ("李四", 72, "Hypertension"), ("王五", 78, "Alzheimer")]
+    return [UserProfile(*pool[i % 3]) for i in range(n)]
+
+
+# ==========================================
+# 单次调用 (逐人接口)
+# ==========================================
+def single_benchmarks():
+    """返回 {名称: fn}，每个 fn 处理 1 位老人 1 个时刻"""
+    from core import StabilityAnalyzer, TruthDiscovery, CareDecision, PrivacyModule
+    from simulation import RealTimeSimulator
+
+    rng = np.random.default_rng(0)
+    hrs = itertools.cycle(75 + rng.normal(0, 5, 4096))
+    state = next(RealTimeSimulator(seed=0).stream_generator("Fall_Bathroom"))[0]
+    profile = _profiles(1)[0]
+
+    stability = StabilityAnalyzer(1.5)
+    stability_inc = StabilityAnalyzer(1.5, incremental=True)
+    truth = TruthDiscovery()
+    decision = CareDecision()
+    privacy = PrivacyModule(seed=0)
+    stream = RealTimeSimulator(seed=0).stream_generator("Infarction")
+
+    return {
+        "stability/update_and_calculate": lambda: stability.update_and_calculate(next(hrs)),
+        "stability/update_and_calculate[incremental]": lambda: stability_inc.update_and_calculate(next(hrs)),
+        "truth/compute_trust_score": lambda: truth.compute_trust_score(state.hr, state.crowd_labels),
+        "decision/evaluate": lambda: decision.evaluate(state, 0.8, 2.0),
+        "privacy/apply_privacy_policy": lambda: privacy.apply_privacy_policy(profile, 31.939, 118.790, "L3"),
+        "simulator/stream_generator": lambda: next(stream),
+    }
+
+
+# ==========================================
+# 批量吞吐 (群体接口)
+# ==========================================
+def batch_benchmarks(n):
+    """返回 {名称: (fn, 处理量)}，除仿真器外每个 fn 处理 n 位老人 1 个时刻"""
+    from core import TruthDiscovery, PopulationDecision, PrivacyModule, GridPyramid
+    from core.stability import batch_entropy
+    from core.engine import CareEngine
+    from simulation import PopulationSimulator
+
+    rng = np.random.default_rng(0)
+    cols = _population(n)
+    windows = 75 + rng.normal(0, 5, (n, 10))
+    conf = rng.random(n)
+    pen = rng.random(n) * 5
+    profiles = _profiles(n)
+    lats = 31.93 + rng.random(n) * 0.02
+    lons = 118.78 + rng.random(n) * 0.02
+    levels = (rng.random(n) < 0.1).astype(np.int8)
+
+    truth = TruthDiscovery()
+    decision = PopulationDecision(n)
+    privacy = PrivacyModule()
+    privacy_seeded = PrivacyModule(seed=0, resident_ids=np.arange(n))
+    index = GridPyramid((31.93, 118.78, 31.95, 118.80))
+    ids = index.insert(lats, lons)
+    cloaking = PrivacyModule(spatial_index=index)
+    # 默认路径: 整体向量化 (单个 Generator)；[seeded]: 逐人随机流 (可复现/可分片)
+    sim = PopulationSimulator(n, rng=np.random.default_rng(0))
+    sim_seeded = PopulationSimulator(n, seed=0)
+    coords = np.stack([lats, lons], axis=1)
+    engine = CareEngine(n, profiles=profiles, coords=coords)
+    engine_seeded = CareEngine(n, profiles=profiles, coords=coords, seed=0)
+
+    def move_and_cloak():
+        index.update(ids, lats + rng.normal(0, 1e-5, n), lons + rng.normal(0, 1e-5, n))
+        cloaking.cloak_population(levels, ids)
+
+    return {
+        "stability/batch_entropy": (lambda: batch_entropy(windows, 1.5), n),
+        "truth/compute_trust_batch": (lambda: truth.compute_trust_batch(cols.hr, cols.crowd_counts), n),
+        "decision/PopulationDecision.evaluate": (lambda: decision.evaluate(cols, conf, pen), n),
+        "privacy/sanitize_population": (lambda: privacy.sanitize_population(profiles, lats, lons, levels), n),
+        "privacy/sanitize_population[seeded]": (
+            lambda: privacy_seeded.sanitize_population(profiles, lats, lons, levels), n),
+        "privacy/update_and_cloak_population": (move_and_cloak, n),
+        # 仿真器按块生成，处理量为 人数 x 时刻数
+        "simulator/PopulationSimulator.generate[60]": (lambda: sim.generate(60), n * 60),
+        "simulator/PopulationSimulator.generate[60,seeded]": (lambda: sim_seeded.generate(60), n * 60),
+        "engine/step": (lambda: engine.step(cols), n),
+        "engine/step[seeded]": (lambda: engine_seeded.step(cols), n),
+    }
+
+
+def bert_benchmarks(model_path, batch_sizes, backend="pytorch"):
+    """返回 {名称@批量: (fn, 批量)}，语义缓存关闭，短语循环取用"""
+    from core.nlp_bert import BertSemanticAnalyzer
+    analyzer = BertSemanticAnalyzer(cache_size=0, backend=backend, model_path=model_path)
+    analyzer.warmup()
+    crowd = CROWD_PHRASES * 8
+    self_texts = SELF_PHRASES * 8
+
+    out = {
+        "bert/predict_crowd_distribution@1": (lambda: analyzer.predict_crowd_distribution(crowd[0]), 1),
+        "bert/predict_self_score@1": (lambda: analyzer.predict_self_score(self_texts[0]), 1),
+    }
+    for b in batch_sizes:
+        out[f"bert/predict_crowd_distribution_batch@{b}"] = (
+            lambda b=b: analyzer.predict_crowd_distribution_batch(crowd[:b]), b)
+        out[f"bert/predict_joint_batch@{b}"] = (lambda b=b: analyzer.predict_joint_batch(crowd[:b]), b)
+    return out
+
+
+def _record(results, name, seconds, items):
+    results[name] = {
+        "items": items,
+        "latency_us": seconds * 1e6,
+        "throughput_per_s": items / seconds if seconds > 0 else float("inf"),
+    }
+    print(f"{name:<52} {seconds * 1e6:>12.1f} us/call {items / seconds:>14,.0f} items/s")
+
+
+def run(sizes, modules=MODULES, model_path=None, bert_batch_sizes=(8, 32), min_time=0.2):
+    results = {}
+    selected = lambda name: name.split("/")[0] in modules
+
+    for name, fn in single_benchmarks().items():
+        if selected(name):
+            _record(results, name, _time_call(fn, min_time), 1)
+
+    for n in sizes:
+        for name, (fn, items) in batch_benchmarks(n).items():
+            if selected(name):
+                _record(results, f"{name}@{n}", _time_call(fn, min_time), items)
+
+    if "bert" in modules:
+        if model_path is None:
+            print("bert: 跳过 (未指定 --model-path)")
+        else:
+            for name, (fn, items) in bert_benchmarks(model_path, bert_batch_sizes).items():
+                _record(results, name, _time_call(fn, min_time, repeat=3), items)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """
+    逐项比较延迟: ratio = 当前 / 基线
+    ratio > 1 + threshold 为回归，ratio < 1 / (1 + threshold) 为提升
+    返回 (报告行列表, 回归项列表)
+    """
+    lines, regressions = [], []
+    measured = {name.split("/")[0] for name in current} # 只报告本次运行涉及的模块
+    for name in sorted(set(current) | {b for b in baseline if b.split("/")[0] in measured}):
+        if name not in baseline:
+            lines.append(f"{name:<52} {'(new)':>10}")
+            continue
+        if name not in current:
+            lines.append(f"{name:<52} {'(missing)':>10}")
+            continue
+        ratio = current[name]["latency_us"] / baseline[name]["latency_us"]
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        lines.append(f"{name:<52} {ratio:>9.2f}x {status}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="核心模块逐时刻开销基准")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 10000], help="社区规模 (人数)")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES), choices=MODULES)
+    parser.add_argument("--model-path", default=None, help="BERT 基准使用的本地小模型目录")
+    parser.add_argument("--bert-batch-sizes", nargs="+", type=int, default=[8, 32])
+    parser.add_argument("--min-time", type=float, default=0.2, help="每项测量的最短总耗时 (秒)")
+    parser.add_argument("--out", default=None, help="结果 JSON 路径")
+    parser.add_argument("--baseline", default=None, help="基线 JSON 路径")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回归阈值 (0.2 表示慢 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.modules, args.model_path, args.bert_batch_sizes, args.min_time)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "sizes": args.sizes,
+            "model_path": args.model_path,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        lines, regressions = compare(results, baseline, args.threshold)
+        print(f"\n对比基线 {args.baseline} (阈值 {args.threshold:.0%}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"FAIL: {len(regressions)} 项回归")
+            return 1
+        print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,9 +4,15 @@
 SIMULATION_FREQ = 1.0
 WINDOW_SIZE = 10
 
+# 位置语义编码 (列式/批量计算使用 int8 编码，下标即编码值)
+LOCATIONS = ["Bedroom", "Bathroom", "LivingRoom", "Park"]
+LEVELS = ["L3", "L4"] # 照护等级编码 (int8 状态向量: 0 = L3, 1 = L4)
+
 # --- 2.1 隐私参数 ---
 DEFAULT_K = 5
 BASE_BLUR_RADIUS = 0.0001
+SPATIAL_INDEX_DEPTH = 10 # 群体感知隐匿的网格金字塔层数 (最细层 2^10 x 2^10)
+PRIVACY_FRAGMENT_CACHE = 4096 # 脱敏档案片段缓存上限 (档案 x 等级)
 
 # --- 2.2 真值发现参数 ---
 KL_SENSITIVITY = 2.0
@@ -37,4 +43,18 @@ VITAL_RANGES = {
     "temp_max": 37.5,    "temp_min": 36.0,
     "rr_max": 20.0,      "rr_min": 12.0,
     "gsr_baseline": 5.0  # 皮肤电基线
-}
\ No newline at end of file
+}
+
+# --- 仪表盘刷新 ---
+UI_MAX_FPS = 4.0        # UI 最高刷新率 (与仿真时钟解耦，等级切换时立即刷新)
+CHART_WINDOW = 60       # 图表显示最近的点数
+CHART_RANGES = {"1 分钟": CHART_WINDOW, "1 小时": 3600, "1 天": 86400, "1 周": 604800} # 图表时间范围 (时刻数)，超出原始层时读取汇总层
+INSTRUMENTATION_PORT = 9464 # 性能埋点本地抓取端口 (/metrics, /metrics.json)
+
+# --- 历史存储 (环形缓冲 + 分级汇总) ---
+HISTORY_CAPACITY = 3600                      # 原始层: 1 小时 (1Hz)
+HISTORY_ROLLUPS = ((60, 1440), (600, 1008))  # (每桶点数, 桶数): 1 天 @ 1 分钟, 1 周 @ 10 分钟
+
+# --- 仿真录制 ---
+RECORDING_CHUNK_BYTES = 64 << 20             # 录制缓冲上限 (每个分块的总字节数)，决定每块的时刻数
+RECORDING_MAX_CHUNK_TICKS = 3600             # 每块最多时刻数 (老人数很少时)
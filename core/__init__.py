@@ -1,6 +1,7 @@
 # core/__init__.py
 # 暴露核心类方便导入
 from .privacy import PrivacyModule
-from .truth_discovery import TruthDiscovery
+from .spatial_index import GridPyramid
+from .truth_discovery import TruthDiscovery, CRHTruthDiscovery
 from .stability import StabilityAnalyzer
-from .decision import CareDecision
\ No newline at end of file
+from .decision import CareDecision, PopulationDecision
\ No newline at end of file
@@ -0,0 +1,251 @@
+# core/async_pipeline.py
+import time
+import asyncio
+import inspect
+import logging
+from collections import deque
+import numpy as np
+
+CROWD, VOICE = "crowd", "voice"
+
+logger = logging.getLogger(__name__)
+
+class AsyncCarePipeline:
+    """
+    asyncio 照护流水线: 传感器时钟、语义推理、渲染为三个独立任务，经有界队列连接
+    - BERT 推理在线程池 (或 BertBatchQueue 的 asyncio 接口) 中执行，时钟任务永不等待推理
+    - 推理进行中，决策沿用最近一次可用的语义结果；新结果落地后下一帧立即生效
+    - 同一老人同一通道的文本在队列中合并，只推理最新一条 (文本突发时队列长度有界)
+    - 不同键的文本并发推理 (上限 max_concurrency)，每条结果落地时逐键检查是否过期
+    - 渲染队列满时丢弃最旧的结果，渲染变慢不会拖慢时钟
+    - 单次推理失败只记录错误并保留上一次的语义结果，语义任务继续处理后续文本
+    """
+    def __init__(self, engine, source, analyzer=None, tick_interval=0.3, result_queue_size=8,
+                 on_semantic=None, recorder=None, max_concurrency=4):
+        self.engine = engine
+        self.source = source                # 逐个产出 (HolographicColumns, t)
+        self.analyzer = analyzer            # BertSemanticAnalyzer 或 BertBatchQueue
+        self.tick_interval = tick_interval  # None 表示不节流 (全速)
+        self.result_queue_size = result_queue_size
+        self.on_semantic = on_semantic      # 语义结果落地回调 (resident, kind, text, value)
+        self.instrumentation = engine.instrumentation
+        self.recorder = recorder            # simulation.recording.Recorder，录制输入、语义输入与输出
+        self.max_concurrency = max_concurrency # 同时在途的语义推理数上限
+
+        # 待推理文本: (resident, kind) -> (text, submit_time)，同键合并为最新一条
+        self._latest_text = {}
+        self._generation = {} # (resident, kind) -> 提交计数，用于丢弃已被清除的过期结果
+        self._landed_generation = {} # (resident, kind) -> 已落地结果的提交计数，丢弃乱序到达的旧结果
+        self._text_keys = deque()
+        self._text_ready = None # asyncio.Event，在 run() 所在事件循环中创建
+        self._results = None
+
+        # 语义输入新鲜度 (每位老人、每个通道)
+        n = engine.n_residents
+        self.landed_at = {CROWD: np.full(n, np.nan), VOICE: np.full(n, np.nan)}
+        self.pending_since = {CROWD: np.full(n, np.nan), VOICE: np.full(n, np.nan)}
+
+        # 统计
+        self.tick_latencies = deque(maxlen=1000)
+        self.n_ticks = 0
+        self.n_inferences = 0
+        self.n_coalesced = 0
+        self.n_dropped_results = 0
+        self.n_failed_inferences = 0
+        self.n_stale_results = 0
+        self.last_error = None
+
+    # ==========================================
+    # 文本输入 (可在任意时刻调用，不阻塞)
+    # ==========================================
+    def submit_crowd_text(self, resident, text):
+        self._submit(resident, CROWD, text)
+
+    def submit_voice_text(self, resident, text):
+        self._submit(resident, VOICE, text)
+
+    def _submit(self, resident, kind, text):
+        self._generation[(resident, kind)] = self._generation.get((resident, kind), 0) + 1
+        if not text:
+            # 空文本: 立即清除语义输入，无需推理
+            self._latest_text.pop((resident, kind), None)
+            self._apply(resident, kind, text, None)
+            return
+
+        key = (resident, kind)
+        if key in self._latest_text:
+            self.n_coalesced += 1
+            self.instrumentation.count("coalesced_texts")
+        else:
+            self._text_keys.append(key)
+            if self._text_ready is not None:
+                self._text_ready.set()
+        now = time.perf_counter()
+        self._latest_text[key] = (text, now)
+        if np.isnan(self.pending_since[kind][resident]):
+            self.pending_since[kind][resident] = now
+
+    def _apply(self, resident, kind, text, value):
+        if kind == CROWD:
+            self.engine.set_crowd_distribution(resident, value)
+        else:
+            penalty, interrupt = value if value is not None else (0.0, False)
+            self.engine.set_voice(resident, penalty, interrupt)
+        self.landed_at[kind][resident] = time.perf_counter()
+        if (resident, kind) not in self._latest_text:
+            # 推理期间没有更新的文本到达，语义输入已是最新
+            self.pending_since[kind][resident] = np.nan
+        if self.on_semantic is not None and value is not None:
+            self.on_semantic(resident, kind, text, value)
+
+    # ==========================================
+    # 三个任务
+    # ==========================================
+    async def _infer(self, kind, text):
+        a = self.analyzer
+        if kind == CROWD:
+            if hasattr(a, "apredict_crowd_distribution"):
+                return await a.apredict_crowd_distribution(text)
+            return await asyncio.get_running_loop().run_in_executor(None, a.predict_crowd_distribution, text)
+        if hasattr(a, "apredict_self_score"):
+            return await a.apredict_self_score(text)
+        return await asyncio.get_running_loop().run_in_executor(None, a.predict_self_score, text)
+
+    async def _semantic_task(self):
+        """
+        每次唤醒取出全部就绪文本并发推理 (最多 max_concurrency 条在途)；
+        analyzer 为 BertBatchQueue 时，同时在途的请求在队列中合并为一次批量前向
+        """
+        sem = asyncio.Semaphore(self.max_concurrency)
+        tasks = set()
+        try:
+            while True:
+                await sem.acquire()
+                while not self._text_keys:
+                    self._text_ready.clear()
+                    await self._text_ready.wait()
+                key = self._text_keys.popleft()
+                item = self._latest_text.pop(key, None)
+                if item is None:
+                    sem.release()
+                    continue # 推理前已被空文本清除
+                task = asyncio.create_task(self._infer_one(key, item[0], self._generation[key], sem))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _infer_one(self, key, text, generation, sem):
+        resident, kind = key
+        start = time.perf_counter()
+        try:
+            value = await self._infer(kind, text)
+        except Exception as exc:
+            self.n_failed_inferences += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            self.instrumentation.count("failed_inferences")
+            logger.warning("语义推理失败 (resident=%s, kind=%s): %s", resident, kind, self.last_error)
+            if key not in self._latest_text:
+                # 没有更新的文本待推理: 沿用旧结果，不再计入滞后
+                self.pending_since[kind][resident] = np.nan
+            return
+        finally:
+            sem.release()
+        self.instrumentation.observe(f"bert_{kind}", time.perf_counter() - start, resident)
+        self.n_inferences += 1
+        # 逐键检查: 并发时同一键较新的文本可能先落地，较旧的结果不得覆盖
+        if generation < self._landed_generation.get(key, 0):
+            self.n_stale_results += 1
+            return
+        if generation != self._generation[key] and key not in self._latest_text:
+            return # 推理期间文本已被清空，丢弃过期结果
+        self._landed_generation[key] = generation
+        self._apply(resident, kind, text, value)
+
+    async def _tick_task(self, max_ticks):
+        for cols, t in self.source:
+            start = time.perf_counter()
+            result = self.engine.step(cols, t)
+            if self.recorder is not None:
+                self.recorder.record(result, self.engine)
+            self.tick_latencies.append(time.perf_counter() - start)
+            self.n_ticks += 1
+
+            if self._results.full():
+                self._results.get_nowait()
+                self.n_dropped_results += 1
+                self.instrumentation.count("dropped_results")
+            self._results.put_nowait((result, self.staleness()))
+
+            if max_ticks is not None and self.n_ticks >= max_ticks:
+                break
+            # 节流到 tick_interval (扣除本帧计算耗时)；全速模式下也让出事件循环
+            elapsed = time.perf_counter() - start
+            wait = max(0.0, self.tick_interval - elapsed) if self.tick_interval else 0.0
+            await asyncio.sleep(wait)
+        await self._results.put(None)
+
+    async def _render_task(self, render):
+        while True:
+            item = await self._results.get()
+            if item is None:
+                return
+            if render is not None:
+                start = time.perf_counter()
+                out = render(*item)
+                if inspect.isawaitable(out):
+                    await out
+                self.instrumentation.observe("render", time.perf_counter() - start)
+
+    async def run(self, render=None, max_ticks=None):
+        """
+        运行流水线直到数据源结束或达到 max_ticks
+        render(result, staleness) 可以是普通函数或协程
+        """
+        self._text_ready = asyncio.Event()
+        self._results = asyncio.Queue(maxsize=self.result_queue_size)
+
+        semantic = asyncio.create_task(self._semantic_task()) if self.analyzer is not None else None
+        try:
+            await asyncio.gather(self._tick_task(max_ticks), self._render_task(render))
+        finally:
+            if self.recorder is not None:
+                self.recorder.flush()
+            if semantic is not None:
+                semantic.cancel()
+                try:
+                    await semantic
+                except asyncio.CancelledError:
+                    pass
+
+    # ==========================================
+    # 监控
+    # ==========================================
+    def staleness(self):
+        """
+        语义输入新鲜度 (秒):
+        lag  — 有更新文本在推理中时，决策仍在使用旧结果的时长 (无待推理文本为 0)
+        age  — 当前生效语义结果距其落地的时长 (从未有结果为 NaN)
+        """
+        now = time.perf_counter()
+        out = {}
+        for kind in (CROWD, VOICE):
+            out[f"{kind}_lag_s"] = np.nan_to_num(now - self.pending_since[kind], nan=0.0)
+            out[f"{kind}_age_s"] = now - self.landed_at[kind]
+        return out
+
+    def stats(self):
+        lat = np.array(self.tick_latencies) * 1000.0
+        return {
+            "ticks": self.n_ticks,
+            "inferences": self.n_inferences,
+            "coalesced_texts": self.n_coalesced,
+            "pending_texts": len(self._latest_text),
+            "dropped_results": self.n_dropped_results,
+            "failed_inferences": self.n_failed_inferences,
+            "stale_results": self.n_stale_results,
+            "last_error": self.last_error,
+            "tick_p50_ms": float(np.percentile(lat, 50)) if len(lat) else 0.0,
+            "tick_p99_ms": float(np.percentile(lat, 99)) if len(lat) else 0.0,
+        }
@@ -1,5 +1,6 @@
 # core/decision.py
-from config import BASE_SCORE, CONTEXT_WEIGHTS, HYSTERESIS_UP, HYSTERESIS_DOWN, VITAL_RANGES
+import numpy as np
+from config import BASE_SCORE, CONTEXT_WEIGHTS, HYSTERESIS_UP, HYSTERESIS_DOWN, VITAL_RANGES, LOCATIONS, LEVELS
 
 class CareDecision:
     def __init__(self):
@@ -53,4 +54,56 @@ class CareDecision:
         elif self.current_level == "L4":
             if score > HYSTERESIS_UP: self.current_level = "L3"
             
-        return score, self.current_level, (old_level != self.current_level)
\ No newline at end of file
+        return score, self.current_level, (old_level != self.current_level)
+
+class PopulationDecision:
+    """
+    群体级向量化决策引擎
+    输入列式体征/置信度/熵罚分数组，一次调用完成全体老人的评分与 L3/L4 迟滞状态推进
+    评分与 CareDecision.evaluate 逐位一致 (相同的 float64 运算顺序)
+    """
+    def __init__(self, n_residents):
+        self.levels = np.zeros(n_residents, dtype=np.int8) # 0 = L3, 1 = L4
+
+        # 上下文权重编译为按位置编码索引的数组 (未配置的位置回退到 Bedroom)
+        fallback = CONTEXT_WEIGHTS["Bedroom"]
+        rows = [CONTEXT_WEIGHTS.get(loc, fallback) for loc in LOCATIONS]
+        self.w_shock = np.array([r["w_shock"] for r in rows])
+        self.w_entropy = np.array([r["w_entropy"] for r in rows])
+        self.w_crowd = np.array([r["w_crowd"] for r in rows])
+
+    def evaluate(self, cols, trust_conf, entropy_penalty):
+        """
+        cols: HolographicColumns (或具有同名列数组的对象)
+        trust_conf, entropy_penalty: (N,) 数组
+        返回: (score, level, changed)，level 为 int8 编码数组 (LEVELS[level] 得到 "L3"/"L4")
+        """
+        f64 = lambda a: np.asarray(a, dtype=np.float64)
+        loc = np.asarray(cols.location, dtype=np.intp)
+        spo2, bp_sys, gsr, temp = f64(cols.spo2), f64(cols.bp_sys), f64(cols.gsr), f64(cols.temp)
+
+        # [A] 冲击与熵
+        loss_shock = self.w_shock[loc] * f64(cols.shock)
+        loss_entropy = f64(entropy_penalty) * self.w_entropy[loc]
+
+        # [B] 群智
+        loss_crowd = self.w_crowd[loc] * (1.0 - f64(trust_conf))
+
+        # [C] 关键生理指标罚分 (与标量版相同的累加顺序)
+        loss_vital = np.zeros(len(loc))
+        loss_vital += np.where(spo2 < VITAL_RANGES["spo2_min"], (VITAL_RANGES["spo2_min"] - spo2) * 3.0, 0.0)
+        loss_vital += np.where(bp_sys < VITAL_RANGES["bp_sys_min"], (VITAL_RANGES["bp_sys_min"] - bp_sys) * 2.0,
+                               np.where(bp_sys > 160, (bp_sys - 160) * 1.0, 0.0))
+        loss_vital += np.where(gsr > VITAL_RANGES["gsr_baseline"] * 2, (gsr - VITAL_RANGES["gsr_baseline"]) * 1.5, 0.0)
+        loss_vital += np.where(temp > 38.0, (temp - 38.0) * 5.0, 0.0)
+
+        # 总分
+        total_loss = loss_shock + loss_entropy + loss_crowd + loss_vital
+        score = np.clip(f64(cols.base_score) - total_loss, 0, 100)
+
+        # 迟滞比较器状态机 (向量化)
+        old_levels = self.levels
+        self.levels = np.where(old_levels == 0, score < HYSTERESIS_DOWN, ~(score > HYSTERESIS_UP)).astype(np.int8)
+
+        # 返回副本: 调用方修改返回值不会破坏迟滞状态
+        return score, self.levels.copy(), self.levels != old_levels
@@ -0,0 +1,171 @@
+# core/engine.py
+import numpy as np
+from config import DEFAULT_K, KL_SENSITIVITY, ENTROPY_THRESHOLD, WINDOW_SIZE
+from .privacy import PrivacyModule
+from .truth_discovery import TruthDiscovery
+from .stability import batch_entropy
+from .decision import PopulationDecision
+from .instrumentation import INSTRUMENTATION
+
+class TickResult:
+    """
+    单个时刻全体老人的处理结果 (各字段为长度 N 的数组)
+    level 为 int8 编码，LEVELS[level[i]] 得到 "L3"/"L4"
+    """
+    __slots__ = ("t", "states", "entropy", "entropy_penalty", "confidence", "score",
+                 "level", "changed", "interrupt", "packets", "kl_div",
+                 "privacy_area")
+
+    def __init__(self, t, states, entropy, entropy_penalty, confidence, score, level, changed, interrupt, packets,
+                 kl_div=None, privacy_area=None):
+        self.t = t
+        self.states = states                   # HolographicColumns (本时刻输入)
+        self.entropy = entropy
+        self.entropy_penalty = entropy_penalty
+        self.confidence = confidence           # 群智置信度
+        self.score = score
+        self.level = level
+        self.changed = changed
+        self.interrupt = interrupt             # SOS / 语音中断
+        self.packets = packets                 # 脱敏数据包列表 (未启用隐私层时为 None)
+        self.kl_div = kl_div                   # 传感器与志愿者分布的 KL 散度
+        self.privacy_area = privacy_area       # 匿名框面积 (度²，隐私代价；未启用隐私层时为 None)
+
+
+class CareEngine:
+    """
+    无界面多老人照护引擎 (Headless Pipeline)
+    每个时刻对全体老人依次执行: 隐私脱敏 -> 熵稳定性 -> 真值发现 -> 迟滞决策 -> SOS/语音高优中断
+    每位老人的滑动窗口与 L3/L4 状态以数组形式保存，结果与逐人使用 StabilityAnalyzer/CareDecision 一致
+    """
+    def __init__(self, n_residents, profiles=None, coords=None, k=DEFAULT_K,
+                 sensitivity=KL_SENSITIVITY, threshold=ENTROPY_THRESHOLD, seed=None, resident_ids=None,
+                 instrumentation=None):
+        """
+        seed / resident_ids: 隐私层随机流的种子与本引擎所含老人的全局编号 (分片运行时传入)
+        instrumentation: 性能埋点 (缺省使用进程级默认实例，默认关闭)
+        """
+        self.n_residents = n_residents
+        self.threshold = threshold
+        self.instrumentation = instrumentation if instrumentation is not None else INSTRUMENTATION
+
+        self.privacy = PrivacyModule(k=k, seed=seed, resident_ids=resident_ids)
+        self.truth = TruthDiscovery(sensitivity=sensitivity)
+        self.decision = PopulationDecision(n_residents)
+
+        # 权威基准 (D_prof) 与位置: 提供 profiles 时启用隐私层并覆盖基准分
+        self.profiles = profiles
+        self.coords = np.asarray(coords, dtype=np.float64) if coords is not None else None
+        if profiles is not None and len(profiles) != n_residents:
+            raise ValueError("profiles 长度必须等于 n_residents")
+        if profiles is not None and self.coords is None:
+            raise ValueError("启用隐私层时必须提供 coords (N, 2) 的 [lat, lon]")
+
+        # 每位老人的心率滑动窗口 (环形缓冲，熵计算与样本顺序无关)
+        self._window = np.zeros((n_residents, WINDOW_SIZE))
+        self._fill = 0
+        self._pos = 0
+
+        # 语义输入 (BERT 志愿者分布 / 语音罚分与中断) 与 SOS 按键
+        self.crowd_dist = np.full((n_residents, 3), np.nan)
+        self.voice_penalty = np.zeros(n_residents)
+        self.voice_interrupt = np.zeros(n_residents, dtype=bool)
+        self.sos = np.zeros(n_residents, dtype=bool)
+
+        # 上一时刻对外发布的等级 (含中断覆盖)，用于本时刻的隐私策略
+        self.last_level = np.zeros(n_residents, dtype=np.int8)
+
+    # ==========================================
+    # 语义与中断输入
+    # ==========================================
+    def set_crowd_distribution(self, i, distribution):
+        """设置第 i 位老人的 BERT 志愿者分布 Q(x)，None 表示回退到群智标签计数"""
+        self.crowd_dist[i] = np.nan if distribution is None else distribution
+
+    def set_voice(self, i, penalty, interrupt):
+        """设置第 i 位老人的语音自述罚分与中断信号"""
+        self.voice_penalty[i] = penalty
+        self.voice_interrupt[i] = interrupt
+
+    def set_sos(self, i, pressed):
+        self.sos[i] = pressed
+
+    # ==========================================
+    # 主流程
+    # ==========================================
+    def step(self, cols, t=None):
+        """
+        处理一个时刻: cols 为 HolographicColumns (N 行，每位老人一行)
+        """
+        n = self.n_residents
+        if len(cols) != n:
+            raise ValueError(f"输入行数 {len(cols)} 与老人数 {n} 不一致")
+
+        stage = self.instrumentation.stage
+        with stage("tick"):
+            # 1. 覆盖基准分 (D_prof)
+            if self.profiles is not None:
+                cols.base_score[:] = [p.base_score for p in self.profiles]
+
+            # 2. 隐私保护 (使用上一时刻的等级)
+            packets = privacy_area = None
+            if self.profiles is not None:
+                with stage("privacy"):
+                    packets, bboxes = self.privacy.sanitize_population(
+                        self.profiles, self.coords[:, 0], self.coords[:, 1], self.last_level, with_bboxes=True)
+                    privacy_area = self.privacy.bbox_area(bboxes)
+
+            # 3. 稳定性 (熵)
+            with stage("entropy"):
+                self._window[:, self._pos] = cols.hr
+                self._pos = (self._pos + 1) % WINDOW_SIZE
+                self._fill = min(self._fill + 1, WINDOW_SIZE)
+                entropy, ent_pen = batch_entropy(self._window[:, :self._fill], self.threshold)
+
+            # 4. 真值发现: 有 BERT 分布的老人走精确路径，其余查表
+            with stage("trust"):
+                conf, kl_div = self.truth.compute_trust_batch(cols.hr, cols.crowd_counts)
+                has_dist = ~np.isnan(self.crowd_dist[:, 0])
+                if has_dist.any():
+                    conf[has_dist], kl_div[has_dist] = self.truth.compute_trust_with_distribution_batch(
+                        np.asarray(cols.hr)[has_dist], self.crowd_dist[has_dist])
+
+            # 5. 决策 (融合语音罚分)
+            with stage("decision"):
+                score, level, changed = self.decision.evaluate(cols, conf, ent_pen + self.voice_penalty)
+
+            # 6. 高优中断 (D_self): 对外发布 L4 / 0 分，不改变迟滞状态机本身
+            interrupt = self.sos | self.voice_interrupt
+            if interrupt.any():
+                score = np.where(interrupt, 0.0, score)
+                level = np.where(interrupt, 1, level).astype(np.int8)
+                changed = changed | interrupt
+            self.last_level = level
+
+        self.instrumentation.count("ticks")
+        self.instrumentation.count("resident_ticks", n)
+        return TickResult(t, cols, entropy, ent_pen, conf, score, level, changed, interrupt, packets, kl_div,
+                          privacy_area)
+
+    def run(self, source):
+        """
+        结果流: source 逐个产出 (HolographicColumns, t)，本方法逐个产出 TickResult
+        UI、批处理与测试都消费同一结果流
+        """
+        for cols, t in source:
+            yield self.step(cols, t)
+
+
+def single_resident_source(stream):
+    """将 RealTimeSimulator.stream_generator 包装为单人列式数据源"""
+    from simulation.actors import HolographicColumns
+    for state, t in stream:
+        yield HolographicColumns.from_states([state]), t
+
+
+def population_source(sim, n_ticks, chunk_ticks=3600):
+    """将 PopulationSimulator 的分块输出展开为逐时刻的列式数据源"""
+    from simulation.actors import HolographicColumns
+    for batch in sim.iter_chunks(n_ticks, chunk_ticks):
+        for j, t in enumerate(batch["t"]):
+            yield HolographicColumns.from_batch(batch, j), int(t)
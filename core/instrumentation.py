@@ -0,0 +1,340 @@
+# core/instrumentation.py
+"""
+照护流水线性能埋点
+- 分阶段计时器与计数器 (隐私、熵、真值发现、决策、BERT、渲染…)
+- 对数分桶直方图: 每个阶段、每位老人的延迟分位数 (p50/p90/p99)
+- 采样分析器: 后台线程定期采样目标线程的调用栈，可在运行时开关
+- 导出: Prometheus 文本格式 / JSON，可选本地 HTTP 端点供抓取
+
+关闭时 stage() 返回共享的空上下文，observe()/count() 直接返回，开销可忽略
+"""
+import json
+import logging
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class LogHistogram:
+    """
+    对数分桶延迟直方图: 下界 min_s，每 2 倍区间 per_octave 个桶 (相对误差约 19%)
+    记录与查询都是 O(1)/O(桶数)，内存固定
+    """
+    def __init__(self, min_s=1e-6, max_s=100.0, per_octave=4):
+        self.min_s = min_s
+        self.per_octave = per_octave
+        n = int(math.ceil(math.log2(max_s / min_s) * per_octave)) + 2
+        self.counts = np.zeros(n, dtype=np.int64)
+        # 第 0 桶: < min_s；第 i 桶上界: min_s * 2^(i/per_octave)
+        self.upper = min_s * 2.0 ** (np.arange(n) / per_octave)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, seconds):
+        if seconds < self.min_s:
+            return 0
+        return min(int(math.log2(seconds / self.min_s) * self.per_octave) + 1, len(self.counts) - 1)
+
+    def observe(self, seconds):
+        self.counts[self._index(seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """q 分位数 (0-100)，返回所在桶的上界 (不超过已观测的最大值)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        i = int(np.searchsorted(np.cumsum(self.counts), rank, side="left"))
+        return float(min(self.upper[min(i, len(self.upper) - 1)], self.max))
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_s": self.sum / self.count if self.count else 0.0,
+            "p50_s": self.percentile(50),
+            "p90_s": self.percentile(90),
+            "p99_s": self.percentile(99),
+            "max_s": self.max,
+        }
+
+
+class _NullStage:
+    """关闭状态下的共享空上下文"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageTimer:
+    __slots__ = ("_instr", "_name", "_resident", "_start")
+
+    def __init__(self, instr, name, resident):
+        self._instr = instr
+        self._name = name
+        self._resident = resident
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._instr.observe(self._name, time.perf_counter() - self._start, self._resident)
+        return False
+
+
+class SamplingProfiler:
+    """
+    采样分析器: 后台线程每 interval 秒读取一次目标线程的调用栈 (sys._current_frames)，
+    按栈累计样本数；top() 给出自身耗时最多的函数，collapsed() 输出火焰图折叠格式
+    """
+    def __init__(self, interval=0.005, thread_id=None, max_depth=64):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n=15):
+        """按自身样本数 (栈顶函数) 排序: [(函数, 样本数, 占比)]"""
+        leaf = Counter()
+        for stack, c in self.stacks.items():
+            leaf[stack[-1]] += c
+        total = self.samples or 1
+        return [(fn, c, c / total) for fn, c in leaf.most_common(n)]
+
+    def collapsed(self):
+        """火焰图折叠格式: 每行 "外层;...;内层 样本数" """
+        return "\n".join(f"{';'.join(stack)} {c}" for stack, c in self.stacks.most_common())
+
+    def reset(self):
+        self.stacks.clear()
+        self.samples = 0
+
+
+class Instrumentation:
+    """
+    埋点注册表: 阶段直方图 (可按老人细分)、计数器、采样分析器与导出
+    用法:
+        with instr.stage("entropy"): ...
+        instr.observe("bert_crowd", dt, resident=3)
+        instr.count("ticks")
+    """
+    def __init__(self, enabled=False, prefix="acas"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}          # stage -> LogHistogram
+        self.resident_histograms = {} # (stage, resident) -> LogHistogram
+        self.counters = Counter()
+        self.profiler = None
+        self._lock = threading.Lock()
+        self._server = None
+        self.server_error = None
+
+    # ==========================================
+    # 开关
+    # ==========================================
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.resident_histograms.clear()
+            self.counters.clear()
+
+    # ==========================================
+    # 记录
+    # ==========================================
+    def stage(self, name, resident=None):
+        """阶段计时上下文；关闭时返回共享空上下文"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name, resident)
+
+    def observe(self, name, seconds, resident=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = LogHistogram()
+            hist.observe(seconds)
+            if resident is not None:
+                key = (name, int(resident))
+                hist = self.resident_histograms.get(key)
+                if hist is None:
+                    hist = self.resident_histograms[key] = LogHistogram()
+                hist.observe(seconds)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += n
+
+    # ==========================================
+    # 采样分析器 (运行时开关)
+    # ==========================================
+    def start_profiler(self, interval=0.005, thread_id=None):
+        if self.profiler is None or (thread_id is not None and thread_id != self.profiler.thread_id):
+            # 目标线程变化 (如 Streamlit 每次重跑换线程): 先停止旧分析器，避免采样线程泄漏
+            if self.profiler is not None:
+                self.profiler.stop()
+            self.profiler = SamplingProfiler(interval, thread_id)
+        self.profiler.interval = interval
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        return self.profiler
+
+    # ==========================================
+    # 导出
+    # ==========================================
+    def snapshot(self):
+        """JSON 可序列化的当前状态"""
+        with self._lock:
+            out = {
+                "enabled": self.enabled,
+                "stages": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "residents": {},
+                "counters": dict(self.counters),
+            }
+            for (name, resident), h in sorted(self.resident_histograms.items()):
+                out["residents"].setdefault(name, {})[str(resident)] = h.summary()
+        if self.profiler is not None:
+            out["profiler"] = {
+                "running": self.profiler.running,
+                "samples": self.profiler.samples,
+                "top": [{"function": fn, "samples": c, "share": s} for fn, c, s in self.profiler.top()],
+            }
+        return out
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.snapshot(), ensure_ascii=False, **kwargs)
+
+    def to_prometheus(self):
+        """Prometheus 文本格式: 阶段延迟为 summary (分位数 + _sum/_count)，计数器为 counter"""
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_seconds 流水线各阶段延迟",
+                 f"# TYPE {p}_stage_seconds summary"]
+        with self._lock:
+            series = [({"stage": name}, h) for name, h in sorted(self.histograms.items())]
+            series += [({"stage": name, "resident": str(r)}, h)
+                       for (name, r), h in sorted(self.resident_histograms.items())]
+            counters = sorted(self.counters.items())
+            for labels, h in series:
+                base = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                for q in (0.5, 0.9, 0.99):
+                    lines.append(f'{p}_stage_seconds{{{base},quantile="{q}"}} {h.percentile(q * 100):.9g}')
+                lines.append(f"{p}_stage_seconds_sum{{{base}}} {h.sum:.9g}")
+                lines.append(f"{p}_stage_seconds_count{{{base}}} {h.count}")
+        for name, value in counters:
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """
+        在后台线程启动本地 HTTP 端点:
+        /metrics (Prometheus 文本)、/metrics.json (JSON)、/profile (火焰图折叠格式)
+        端口不可用时不启动导出端点 (埋点本身照常工作)，记录警告并返回 None，原因见 server_error
+        """
+        if self._server is not None:
+            return self._server
+        instr = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = instr.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = instr.to_json(indent=2), "application/json"
+                elif self.path == "/profile" and instr.profiler is not None:
+                    body, ctype = instr.profiler.collapsed(), "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as exc:
+            self.server_error = f"{host}:{port}: {exc}"
+            logger.warning("埋点导出端点未启动 (%s)", self.server_error)
+            return None
+        self.server_error = None
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# 进程级默认实例 (默认关闭)，未显式传入时各组件共用
+INSTRUMENTATION = Instrumentation()
@@ -0,0 +1,94 @@
+# core/nlp_backends.py
+"""
+零样本分类器的 CPU 推理后端
+- pytorch: 原始 fp32 transformers pipeline
+- int8:    PyTorch 动态 int8 量化 (nn.Linear 权重量化，激活动态量化)
+- onnx:    ONNX Runtime 计算图 (optimum 导出/加载)
+所有后端都返回 zero-shot-classification pipeline，上层调用方式不变
+
+torch / transformers / onnxruntime 均在首次加载模型时才导入，
+已加载的模型登记在进程级注册表中 (不依赖 Streamlit 缓存)，同一进程内重复创建分析器不会重复加载
+
+线程数: PyTorch 的 torch.set_num_threads 是进程级全局设置 (影响本进程所有 PyTorch 计算)，
+只在第一次指定时设置一次，之后不同的取值被忽略并给出警告；ONNX Runtime 的线程数属于各自的会话
+"""
+import os
+import threading
+import warnings
+
+BACKENDS = ("pytorch", "int8", "onnx")
+
+_MODEL_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_TORCH_THREADS = None # 已设置的 PyTorch 进程级线程数
+
+def set_torch_threads(num_threads):
+    """设置 PyTorch 进程级线程数 (只生效一次)，返回实际生效的线程数"""
+    global _TORCH_THREADS
+    if _TORCH_THREADS is None:
+        import torch
+        torch.set_num_threads(num_threads)
+        _TORCH_THREADS = num_threads
+    elif num_threads != _TORCH_THREADS:
+        warnings.warn(f"PyTorch 线程数是进程级设置，已设为 {_TORCH_THREADS}，忽略 num_threads={num_threads}")
+    return _TORCH_THREADS
+
+def get_zero_shot_pipeline(model, backend="pytorch", num_threads=None):
+    """
+    进程级模型注册表: 按 (模型, 后端) 缓存已加载的 pipeline
+    PyTorch 线程数是进程级设置，不区分模型；onnx 后端的线程数属于会话，计入注册键
+    """
+    if num_threads and backend != "onnx":
+        set_torch_threads(num_threads)
+    key = (model, backend, num_threads if backend == "onnx" else None)
+    with _REGISTRY_LOCK:
+        if key not in _MODEL_REGISTRY:
+            print(f"Loading BERT/BART Model ({backend})...")
+            _MODEL_REGISTRY[key] = load_zero_shot_pipeline(model, backend, num_threads)
+        return _MODEL_REGISTRY[key]
+
+def clear_model_registry():
+    """释放注册表中的模型 (测试或切换模型时使用)"""
+    with _REGISTRY_LOCK:
+        _MODEL_REGISTRY.clear()
+
+def load_zero_shot_pipeline(model, backend="pytorch", num_threads=None):
+    """
+    model: HuggingFace 模型 ID 或本地目录 (本地目录可完全离线运行)
+    num_threads: onnx 后端的会话线程数 (None 表示使用库默认值)；
+                 PyTorch 后端的线程数为进程级设置，由 set_torch_threads 设置
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"未知推理后端: {backend} (可选: {', '.join(BACKENDS)})")
+
+    import torch
+    from transformers import pipeline
+
+    local_only = os.path.isdir(model)
+
+    if backend == "onnx":
+        import onnxruntime as ort
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        # 目录内已有导出好的 model.onnx 时直接加载，否则从 PyTorch 权重导出
+        exported = local_only and os.path.exists(os.path.join(model, "model.onnx"))
+        ort_model = ORTModelForSequenceClassification.from_pretrained(
+            model, export=not exported, session_options=options,
+            provider="CPUExecutionProvider", local_files_only=local_only,
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model, local_files_only=local_only)
+        return pipeline("zero-shot-classification", model=ort_model, tokenizer=tokenizer)
+
+    if backend == "pytorch":
+        return pipeline("zero-shot-classification", model=model, use_safetensors=True)
+
+    # 动态量化算子只在 CPU 上可用
+    classifier = pipeline("zero-shot-classification", model=model, use_safetensors=True, device="cpu")
+    classifier.model = torch.ao.quantization.quantize_dynamic(
+        classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return classifier
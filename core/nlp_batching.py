@@ -0,0 +1,178 @@
+# core/nlp_batching.py
+import time
+import threading
+from collections import deque, Counter
+from concurrent.futures import Future
+
+class BertBatchQueue:
+    """
+    BERT 推理微批队列 (Micro-batching Front End)
+    并发到达的文本先进入待处理队列，最多等待 max_wait_ms 毫秒或凑满 max_batch_size 条，
+    再合并为一次 padding 对齐的批量前向，逐条回填 Future:
+    单一通道的批按通道 (志愿者 crowd / 老人自述 self) 前向；两个通道混合的批经 predict_joint_batch 一次前向
+    同时提供同步与 asyncio 接口，并统计队列深度与批大小
+    """
+    def __init__(self, analyzer, max_batch_size=16, max_wait_ms=5.0):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending = deque() # (kind, text, future, enqueue_time)
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # --- 统计 ---
+        self._n_requests = 0
+        self._n_batches = 0
+        self._batch_sizes = Counter()
+        self._max_depth = 0
+        self._last_batch_latency = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="bert-batch-queue", daemon=True)
+        self._worker.start()
+
+    # ==========================================
+    # 提交接口
+    # ==========================================
+    def submit_crowd(self, text):
+        """提交志愿者文本，返回 Future -> Q(x) 分布"""
+        return self._submit("crowd", text)
+
+    def submit_self(self, text):
+        """提交老人语音文本，返回 Future -> (罚分, 中断信号)"""
+        return self._submit("self", text)
+
+    def predict_crowd_distribution(self, text):
+        """[同步] 与 BertSemanticAnalyzer.predict_crowd_distribution 相同的返回值"""
+        return self.submit_crowd(text).result()
+
+    def predict_self_score(self, text):
+        """[同步] 与 BertSemanticAnalyzer.predict_self_score 相同的返回值"""
+        return self.submit_self(text).result()
+
+    async def apredict_crowd_distribution(self, text):
+        """[asyncio] 不阻塞事件循环的志愿者通道推理"""
+        import asyncio
+        return await asyncio.wrap_future(self.submit_crowd(text))
+
+    async def apredict_self_score(self, text):
+        """[asyncio] 不阻塞事件循环的老人自述通道推理"""
+        import asyncio
+        return await asyncio.wrap_future(self.submit_self(text))
+
+    def _submit(self, kind, text):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BertBatchQueue 已关闭")
+            self._pending.append((kind, text, future, time.perf_counter()))
+            self._n_requests += 1
+            self._max_depth = max(self._max_depth, len(self._pending))
+            self._cond.notify()
+        return future
+
+    # ==========================================
+    # 后台批处理线程
+    # ==========================================
+    def _next_batch(self):
+        """等待首条请求，再等待凑批直到满员或超时；关闭且队列为空时返回 None"""
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+
+            deadline = self._pending[0][3] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(self.max_batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            start = time.perf_counter()
+            # 已被调用方取消的请求不再推理
+            live = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if len({item[0] for item in live}) == 2 and hasattr(self.analyzer, "predict_joint_batch"):
+                self._run_joint(live)
+            else:
+                for kind, predict in (("crowd", self.analyzer.predict_crowd_distribution_batch),
+                                      ("self", self.analyzer.predict_self_score_batch)):
+                    items = [item for item in live if item[0] == kind]
+                    if items:
+                        self._resolve(items, predict, [item[1] for item in items])
+
+            with self._cond:
+                self._n_batches += 1
+                self._batch_sizes[len(batch)] += 1
+                self._last_batch_latency = time.perf_counter() - start
+
+    @staticmethod
+    def _resolve(items, predict, texts, pick=None):
+        """执行一次批量前向并逐条回填 Future；pick(item, out) 从输出中取出该请求的结果"""
+        try:
+            outputs = predict(texts)
+        except Exception as e:
+            for item in items:
+                item[2].set_exception(e)
+            return
+        if pick is None:
+            for item, out in zip(items, outputs):
+                item[2].set_result(out)
+        else:
+            by_text = dict(zip(texts, outputs))
+            for item in items:
+                item[2].set_result(pick(item, by_text[item[1]]))
+
+    def _run_joint(self, items):
+        """
+        两个通道混合的批: 去重后的文本一次 predict_joint_batch 前向 (6 个假设)，
+        代替两个通道各一次前向；同一文本同时出现在两个通道时只推理一次
+        """
+        texts = list(dict.fromkeys(item[1] for item in items))
+        self._resolve(items, self.analyzer.predict_joint_batch, texts,
+                      pick=lambda item, out: out[0] if item[0] == "crowd" else out[1])
+
+    # ==========================================
+    # 统计与生命周期
+    # ==========================================
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        """队列深度、批大小分布与吞吐统计"""
+        with self._cond:
+            n_batched = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self._max_depth,
+                "requests": self._n_requests,
+                "batches": self._n_batches,
+                "mean_batch_size": n_batched / self._n_batches if self._n_batches else 0.0,
+                "batch_size_hist": dict(sorted(self._batch_sizes.items())),
+                "last_batch_latency_ms": self._last_batch_latency * 1000.0,
+            }
+
+    def close(self, wait=True):
+        """停止接收新请求，处理完队列中剩余请求后退出后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
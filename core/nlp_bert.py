@@ -1,39 +1,187 @@
 # core/nlp_bert.py
 import numpy as np
-from transformers import pipeline
-import streamlit as st
+from .semantic_cache import SemanticCache
+from .nlp_backends import get_zero_shot_pipeline
+
+MODEL_ID = "valhalla/distilbart-mnli-12-1"
 
 class BertSemanticAnalyzer:
     """
     基于 Transformer (BERT/BART) 的语义认知引擎
     利用 Zero-Shot Classification 实现文本到概率分布的映射
+    模型在第一次语义预测时才加载 (导入本模块不会引入 transformers/torch)
     """
-    def __init__(self):
-        # 使用 Streamlit 缓存加载模型，防止每次刷新页面重载 (模型约 400MB-1GB)
-        self.classifier = self._load_model()
+    def __init__(self, cache_size=4096, cache_path=None, backend="pytorch", model_path=None, num_threads=None):
+        # 推理后端: pytorch (fp32) / int8 (动态量化) / onnx (ONNX Runtime)
+        # model_path 指向本地模型目录时完全离线加载
+        model = model_path or MODEL_ID
+        self.backend = backend
+        self.num_threads = num_threads
+        self._model = model
+        self._classifier = None
+        self.model_id = model if backend == "pytorch" else f"{model}@{backend}"
+
+        # 语义结果缓存: 重复的志愿者短语 ("he fell") 不再重复推理
+        # cache_path 指定 SQLite 文件后跨重启保留；cache_size=0 关闭缓存
+        self.cache = SemanticCache(cache_size, cache_path) if cache_size else None
         
         # 定义标签空间
         self.crowd_labels = ["Normal", "Risk", "Fall"]
         self.self_labels = ["Urgent", "Pain", "Safe"]
 
-    @st.cache_resource
-    def _load_model(_self):
+    @property
+    def classifier(self):
         # 使用轻量级的高效模型 (distilbart-mnli) 用于零样本分类
-        # 第一次运行会自动下载模型
-        print("Loading BERT/BART Model...")
-        return pipeline("zero-shot-classification", model="valhalla/distilbart-mnli-12-1",use_safetensors=True,)
+        # 首次访问时经进程级注册表加载，防止每次刷新页面重载 (模型约 400MB-1GB)
+        if self._classifier is None:
+            self._classifier = get_zero_shot_pipeline(self._model, self.backend, self.num_threads)
+        return self._classifier
+
+    def warmup(self):
+        """提前加载模型 (例如在 UI 加载提示中调用)，避免首条预测承担加载耗时"""
+        return self.classifier is not None
 
     def predict_crowd_distribution(self, text):
         """
         [BERT] 输入志愿者文本 -> 输出 Q(x) 概率分布
         """
-        if not text:
+        return self.predict_crowd_distribution_batch([text])[0]
+
+    def predict_self_score(self, text):
+        """
+        [BERT] 输入老人语音 -> 预测严重程度罚分 & 中断信号
+        """
+        return self.predict_self_score_batch([text])[0]
+
+    def predict_crowd_distribution_batch(self, texts):
+        """
+        [BERT 批量] 多条志愿者文本一次前向 (padding 对齐) -> Q(x) 分布列表
+        """
+        results = self._classify_batch(texts, self.crowd_labels, multi_label=False)
+        return [self._crowd_from_result(r) for r in results]
+
+    def predict_self_score_batch(self, texts):
+        """
+        [BERT 批量] 多条老人语音一次前向 -> (罚分, 中断信号) 列表
+        """
+        results = self._classify_batch(texts, self.self_labels, multi_label=True)
+        return [self._self_from_result(r) for r in results]
+
+    def predict_joint(self, text):
+        """
+        [BERT 单次联合] 同一文本同时需要志愿者分布与自述评分时使用
+        返回: (Q(x) 分布, (罚分, 中断信号))，与分别调用两个 predict_* 的结果一致
+        """
+        return self.predict_joint_batch([text])[0]
+
+    def predict_joint_batch(self, texts):
+        """
+        [BERT 批量联合] 全部 6 个假设 (Normal/Risk/Fall/Urgent/Pain/Safe) 在一次批量前向中评估，
+        由同一组 NLI logits 同时导出 softmax 志愿者分布与 multi-label 自述分数
+        """
+        crowd = [None] * len(texts)
+        selfs = [None] * len(texts)
+        todo = {} # 归一化缓存键 -> 位置列表
+        for i, t in enumerate(texts):
+            if not t:
+                continue
+            if self.cache:
+                crowd_key = self.cache.make_key(t, self.crowd_labels, self.model_id, False)
+                self_key = self.cache.make_key(t, self.self_labels, self.model_id, True)
+                crowd[i], selfs[i] = self.cache.get(crowd_key), self.cache.get(self_key)
+                if crowd[i] is not None and selfs[i] is not None:
+                    continue
+                key = (crowd_key, self_key)
+            else:
+                key = i
+            todo.setdefault(key, []).append(i)
+
+        if todo:
+            keys = list(todo)
+            labels = self.crowd_labels + self.self_labels
+            logits = self._nli_logits([texts[todo[k][0]] for k in keys], labels)
+            n_crowd = len(self.crowd_labels)
+            for key, lg in zip(keys, logits):
+                crowd_res = self._postprocess(lg[:n_crowd], self.crowd_labels, multi_label=False)
+                self_res = self._postprocess(lg[n_crowd:], self.self_labels, multi_label=True)
+                if self.cache:
+                    # 写入两个通道各自的缓存键，之后的单通道调用同样命中
+                    self.cache.put(key[0], crowd_res)
+                    self.cache.put(key[1], self_res)
+                for i in todo[key]:
+                    crowd[i], selfs[i] = crowd_res, self_res
+
+        return [(self._crowd_from_result(c), self._self_from_result(r)) for c, r in zip(crowd, selfs)]
+
+    def _nli_logits(self, texts, labels):
+        """
+        直接调用 NLI 模型: 所有 (文本, 假设) 对一次 padding 前向
+        返回 (len(texts), len(labels), n_classes) 的 logits
+        """
+        import torch
+
+        clf = self.classifier
+        template = "This example is {}." # 与 zero-shot pipeline 默认模板一致
+        premises = [t for t in texts for _ in labels]
+        hypotheses = [template.format(l) for _ in texts for l in labels]
+        # 与 pipeline 一致: 超长时只截断前提 (文本)，保留完整假设
+        inputs = clf.tokenizer(premises, hypotheses, padding=True, truncation="only_first", return_tensors="pt")
+        with torch.no_grad():
+            logits = clf.model(**inputs.to(clf.device)).logits
+        return logits.float().cpu().numpy().reshape(len(texts), len(labels), -1)
+
+    def _postprocess(self, logits, labels, multi_label):
+        """复现 zero-shot pipeline 的后处理: (n_labels, n_classes) logits -> {labels, scores}"""
+        entailment_id = self.classifier.entailment_id
+        if multi_label:
+            # 每个标签独立地在 entailment vs contradiction 上做 softmax
+            contradiction_id = -1 if entailment_id == 0 else 0
+            entail_contr = logits[:, [contradiction_id, entailment_id]]
+            scores = (np.exp(entail_contr) / np.exp(entail_contr).sum(-1, keepdims=True))[:, 1]
+        else:
+            # 在所有候选标签的 entailment logits 上做 softmax
+            entail = logits[:, entailment_id]
+            scores = np.exp(entail) / np.exp(entail).sum(-1, keepdims=True)
+        order = list(reversed(scores.argsort()))
+        return {"labels": [labels[i] for i in order], "scores": scores[order].tolist()}
+
+    def _classify_batch(self, texts, labels, multi_label):
+        """
+        对非空文本执行一次批量零样本分类，空文本位置返回 None
+        命中缓存的文本直接返回，未命中的 (去重后) 合并为一次推理并写回缓存
+        """
+        results = [None] * len(texts)
+        todo = {} # 缓存键 -> 需要该结果的位置列表
+        for i, t in enumerate(texts):
+            if not t:
+                continue
+            key = self.cache.make_key(t, labels, self.model_id, multi_label) if self.cache else i
+            hit = self.cache.get(key) if self.cache else None
+            if hit is not None:
+                results[i] = hit
+            else:
+                todo.setdefault(key, []).append(i)
+
+        if todo:
+            keys = list(todo)
+            outputs = self.classifier([texts[todo[k][0]] for k in keys], labels, multi_label=multi_label,
+                                      batch_size=len(keys) * len(labels))
+            for key, out in zip(keys, outputs):
+                if self.cache:
+                    self.cache.put(key, out)
+                for i in todo[key]:
+                    results[i] = out
+        return results
+
+    def cache_stats(self):
+        """缓存命中/未命中统计"""
+        return self.cache.stats() if self.cache else {}
+
+    def _crowd_from_result(self, result):
+        if result is None:
             # 默认不可知分布
             return np.array([0.33, 0.33, 0.34])
-            
-        # 让模型预测该文本属于 Normal, Risk, Fall 的概率
-        result = self.classifier(text, self.crowd_labels, multi_label=False)
-        
+
         # result['scores'] 是按照 result['labels'] 顺序排列的
         # 我们需要将其对齐到固定的 [Normal, Risk, Fall] 顺序
         label_score_map = {l: s for l, s in zip(result['labels'], result['scores'])}
@@ -48,15 +196,10 @@ class BertSemanticAnalyzer:
         # 归一化 (防止精度误差)
         return distribution / np.sum(distribution)
 
-    def predict_self_score(self, text):
-        """
-        [BERT] 输入老人语音 -> 预测严重程度罚分 & 中断信号
-        """
-        if not text:
+    def _self_from_result(self, result):
+        if result is None:
             return 0.0, False
-            
-        # 预测文本的紧急程度
-        result = self.classifier(text, self.self_labels, multi_label=True)
+
         scores = {l: s for l, s in zip(result['labels'], result['scores'])}
         
         # 提取特征分数
@@ -1,6 +1,8 @@
 # core/privacy.py
+from collections import OrderedDict
 import numpy as np
-from config import BASE_BLUR_RADIUS
+from config import BASE_BLUR_RADIUS, LEVELS, PRIVACY_FRAGMENT_CACHE
+from utils.seeding import subsystem_seed, ResidentStreams
 
 class PrivacyModule:
     """
@@ -9,9 +11,21 @@ class PrivacyModule:
     1. 属性泛化 (Attribute Generalization): 年龄、病史脱敏
     2. 位置 K-匿名 (Location K-Anonymity): 动态地理围栏
     3. 动态博弈 (Break-glass): L3隐私优先 vs L4生命优先
+
+    传入 spatial_index (GridPyramid) 时启用群体感知隐匿: 位置框为网格金字塔中包含至少 k 位老人的网格对齐框
+    (Casper 式，自底向上取第一个满足的网格或兄弟网格对，不一定是最小矩形)，
+    否则沿用基于 BASE_BLUR_RADIUS 的随机偏移框
+
+    seed: 给定时位置噪声可复现 (单人接口使用子系统随机流，批量接口每位老人一条随机流，
+    按全局编号 resident_ids 派生，分片运行与整体运行一致)；缺省沿用全局 np.random
     """
-    def __init__(self, k=5):
+    def __init__(self, k=5, spatial_index=None, seed=None, resident_ids=None):
         self.default_k = k
+        self.spatial_index = spatial_index
+        self.seed = seed
+        self.resident_ids = resident_ids
+        self.rng = np.random if seed is None else np.random.default_rng(subsystem_seed(seed, "privacy"))
+        self._streams = None
         
         # 定义疾病泛化树 (Generalization Hierarchy)
         # Level 0 (Key) -> Level 1 (Value)
@@ -24,12 +38,113 @@ class PrivacyModule:
             "Alzheimer":    "Neurological (Cognitive)",     # 阿兹海默 -> 神经(认知)
             "Infarction":   "Cardiovascular (Acute)"        # 心梗 -> 心血管(急性)
         }
+        
+        # 脱敏档案片段缓存 (LRU，最多 PRIVACY_FRAGMENT_CACHE 项): (姓名, 年龄, 病史, 等级, K) -> 片段
+        self._fragments = OrderedDict()
 
-    def apply_privacy_policy(self, user_profile, lat, lon, system_level="L3"):
+    def apply_privacy_policy(self, user_profile, lat, lon, system_level="L3", resident_id=None):
         """
         核心方法：根据当前系统等级(L3/L4)动态应用隐私策略
+        resident_id: 该老人在 spatial_index 中的编号 (启用群体感知隐匿时使用)
         返回：脱敏后的数据字典 (Sanitized Profile)
         """
+        # --- 1. 属性泛化 (只随档案与等级变化，按 (档案, 等级) 缓存) ---
+        fragment = self._profile_fragment(user_profile, system_level)
+        effective_k = fragment["k_level"]
+            
+        # --- 2. 位置 K-匿名 (Location K-Anonymity) ---
+        
+        if self.spatial_index is not None and resident_id is not None:
+            # 群体感知隐匿: 框内真实包含至少 K 位老人 (位置以索引中的最新值为准)
+            boxes, _ = self.spatial_index.cloak(resident_id, effective_k)
+            bbox = boxes[0].tolist()
+        else:
+            # 计算泛化半径
+            # L4时 K=1，半径极小(精确)；L3时 K=5，半径大(模糊)
+            radius = BASE_BLUR_RADIUS * effective_k
+            
+            # 引入随机噪声 (中心偏移)
+            noise_lat = self.rng.uniform(-radius/2, radius/2)
+            noise_lon = self.rng.uniform(-radius/2, radius/2)
+            
+            # 构建匿名框
+            center_lat = lat + noise_lat
+            center_lon = lon + noise_lon
+            
+            bbox = [
+                center_lon - radius, center_lat - radius,
+                center_lon + radius, center_lat + radius
+            ]
+        
+        # --- 3. 输出脱敏数据包 ---
+        return {**fragment, "bbox": bbox}
+
+    def sanitize_population(self, profiles, lats, lons, levels, rng=None, ids=None, with_bboxes=False):
+        """
+        批量脱敏: 一次处理整个社区
+        profiles: UserProfile 列表；lats/lons: 坐标数组；levels: int8 等级编码数组 (LEVELS 下标)
+        rng: np.random.Generator，位置噪声全部取自该生成器；
+             缺省时若构造时给定 seed 则使用每位老人的随机流，否则新建一个
+        ids: 启用 spatial_index 时各老人在索引中的编号 (缺省为 0..n-1)
+        返回与 apply_privacy_policy 格式相同的数据包列表；
+        with_bboxes=True 时返回 (数据包列表, bboxes (n, 4) 数组)，便于向量化计算匿名框面积等隐私代价
+        """
+        levels = np.asarray(levels)
+        n = len(levels)
+        fragments = [self._profile_fragment(p, LEVELS[lv]) for p, lv in zip(profiles, levels.tolist())]
+
+        if self.spatial_index is not None:
+            bboxes, _ = self.cloak_population(levels, ids)
+        else:
+            k = np.where(levels == LEVELS.index("L4"), 1, self.default_k)
+            radius = BASE_BLUR_RADIUS * k
+            if rng is None and self.seed is not None:
+                u = self._resident_streams(n).random(2)
+                noise_lat = (u[:, 0] - 0.5) * radius
+                noise_lon = (u[:, 1] - 0.5) * radius
+            else:
+                if rng is None:
+                    rng = np.random.default_rng()
+                noise_lat = rng.uniform(-radius/2, radius/2, n)
+                noise_lon = rng.uniform(-radius/2, radius/2, n)
+            center_lat = np.asarray(lats, dtype=np.float64) + noise_lat
+            center_lon = np.asarray(lons, dtype=np.float64) + noise_lon
+            bboxes = np.stack([
+                center_lon - radius, center_lat - radius,
+                center_lon + radius, center_lat + radius
+            ], axis=1)
+
+        packets = [{**frag, "bbox": bbox} for frag, bbox in zip(fragments, bboxes.tolist())]
+        return (packets, bboxes) if with_bboxes else packets
+
+    @staticmethod
+    def bbox_area(bboxes):
+        """匿名框面积 (度²): bboxes 为 (n, 4) 的 [lon_min, lat_min, lon_max, lat_max]"""
+        bboxes = np.asarray(bboxes)
+        return (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+    def _resident_streams(self, n):
+        if self._streams is None:
+            ids = np.arange(n) if self.resident_ids is None else self.resident_ids
+            self._streams = ResidentStreams(self.seed, "privacy", ids)
+        if len(self._streams) != n:
+            raise ValueError(f"批量脱敏人数 {n} 与随机流数量 {len(self._streams)} 不一致")
+        return self._streams
+
+    def _profile_fragment(self, user_profile, system_level):
+        # 片段中的 k_level 取决于 default_k: 纳入缓存键，运行中修改 default_k 不会读到旧片段
+        key = (user_profile.name, user_profile.age, user_profile.condition, system_level, self.default_k)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._fragments[key] = self._generalize_profile(user_profile, system_level)
+            if len(self._fragments) > PRIVACY_FRAGMENT_CACHE:
+                self._fragments.popitem(last=False)
+        else:
+            self._fragments.move_to_end(key)
+        return fragment
+
+    def _generalize_profile(self, user_profile, system_level):
+        """属性泛化: 返回除位置框外的脱敏字段"""
         
         # --- 策略决策逻辑 ---
         if system_level == "L4":
@@ -45,8 +160,6 @@ class PrivacyModule:
             effective_k = self.default_k
             show_precise_disease = False # 暴露 Level 1
             show_precise_age = False
-            
-        # --- 1. 属性泛化 (Attribute Generalization) ---
         
         # [Age] 年龄泛化
         if show_precise_age:
@@ -64,37 +177,29 @@ class PrivacyModule:
             # Level 1: 映射到大类，如果没有匹配则显示 "General Chronic"
             # 既保护了隐私(不知道是具体哪种病)，又保留了急救类别信息
             sanitized_disease = self.disease_hierarchy.get(raw_disease, "General Chronic Condition")
-            
-        # --- 2. 位置 K-匿名 (Location K-Anonymity) ---
-        
-        # 计算泛化半径
-        # L4时 K=1，半径极小(精确)；L3时 K=5，半径大(模糊)
-        radius = BASE_BLUR_RADIUS * effective_k
-        
-        # 引入随机噪声 (中心偏移)
-        noise_lat = np.random.uniform(-radius/2, radius/2)
-        noise_lon = np.random.uniform(-radius/2, radius/2)
         
-        # 构建匿名框
-        center_lat = lat + noise_lat
-        center_lon = lon + noise_lon
-        
-        bbox = [
-            center_lon - radius, center_lat - radius,
-            center_lon + radius, center_lat + radius
-        ]
-        
-        # --- 3. 输出脱敏数据包 ---
-        sanitized_data = {
+        return {
             "uid": self._mask_id(user_profile.name), # 姓名脱敏
             "age_group": sanitized_age,
             "condition_category": sanitized_disease,
             "k_level": effective_k,
-            "bbox": bbox,
             "privacy_mode": "EMERGENCY (Break-glass)" if system_level == "L4" else "PROTECTED (K-Anon)"
         }
-        
-        return sanitized_data
+
+    def cloak_population(self, levels, ids=None):
+        """
+        批量位置隐匿 (需要 spatial_index): levels 为 int8 等级编码数组 (LEVELS 下标)，
+        L4 老人 K 降为 1 (Break-glass)，其余使用 default_k
+        ids 缺省时为 0..len(levels)-1
+        返回 (bboxes (n, 4), 框内实际人数)
+        """
+        if self.spatial_index is None:
+            raise RuntimeError("cloak_population 需要在构造时传入 spatial_index")
+        levels = np.asarray(levels)
+        if ids is None:
+            ids = np.arange(len(levels))
+        k = np.where(levels == LEVELS.index("L4"), 1, self.default_k)
+        return self.spatial_index.cloak(ids, k)
 
     def get_k_anonymity_box(self, lat, lon):
         """
@@ -0,0 +1,112 @@
+# core/semantic_cache.py
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class SemanticCache:
+    """
+    BERT 语义结果缓存 (内存 LRU + 可选 SQLite 持久化)
+    键: 归一化文本 + 标签集合 + 模型 ID + multi_label 标志
+    值: 零样本分类原始结果 {"labels": [...], "scores": [...]}
+    """
+    def __init__(self, max_entries=4096, db_path=None, max_db_entries=100000):
+        self.max_entries = max_entries
+        self.max_db_entries = max_db_entries
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS bert_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON bert_cache(last_used)")
+            self._db.commit()
+            self._db_count = self._db.execute("SELECT COUNT(*) FROM bert_cache").fetchone()[0]
+
+    @staticmethod
+    def normalize(text):
+        """归一化: 去首尾空白、合并连续空白、大小写折叠 ("He  fell " == "he fell")"""
+        return " ".join(text.split()).casefold()
+
+    def make_key(self, text, labels, model_id, multi_label):
+        return json.dumps([self.normalize(text), list(labels), model_id, bool(multi_label)],
+                          ensure_ascii=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value FROM bert_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE bert_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._put_mem(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        value = {"labels": list(value["labels"]), "scores": [float(s) for s in value["scores"]]}
+        with self._lock:
+            self._put_mem(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO bert_cache VALUES (?, ?, ?)",
+                                 (key, json.dumps(value, ensure_ascii=False), time.time()))
+                self._db_count += 1
+                if self._db_count > self.max_db_entries:
+                    self._evict_db()
+                self._db.commit()
+
+    def _put_mem(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_db(self):
+        n = self._db.execute("SELECT COUNT(*) FROM bert_cache").fetchone()[0]
+        self._db_count = min(n, self.max_db_entries)
+        if n > self.max_db_entries:
+            # 按最近使用时间淘汰最旧的记录
+            self._db.execute(
+                "DELETE FROM bert_cache WHERE key IN "
+                "(SELECT key FROM bert_cache ORDER BY last_used ASC LIMIT ?)", (n - self.max_db_entries,)
+            )
+            self.evictions += n - self.max_db_entries
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "mem_entries": len(self._mem),
+                "db_entries": self._db_count if self._db is not None else 0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
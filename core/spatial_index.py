@@ -0,0 +1,160 @@
+# core/spatial_index.py
+import numpy as np
+from config import SPATIAL_INDEX_DEPTH
+
+class GridPyramid:
+    """
+    全体老人位置的网格金字塔索引 (完全四叉树的稠密数组实现)
+    第 L 层为 2^L x 2^L 个网格，每层保存各网格内的人数；
+    位置更新只修改发生变化的网格计数 (np.add.at 批量增减)，无需重建
+
+    cloak() 实现 Casper 式网格对齐隐匿: 从最细网格开始自底向上，
+    若当前网格人数 < k，先尝试与水平/垂直兄弟网格合并，仍不足再上升到父网格，
+    返回第一个人数 >= k 的金字塔网格或兄弟网格对 (含本人)；
+    结果是自底向上路径上第一个满足条件的网格对齐框，不一定是包含 k 人的最小矩形
+    """
+    def __init__(self, bounds, depth=SPATIAL_INDEX_DEPTH):
+        """bounds: (lat_min, lon_min, lat_max, lon_max) 社区范围，范围外的位置归入边缘网格"""
+        lat_min, lon_min, lat_max, lon_max = bounds
+        if lat_max <= lat_min or lon_max <= lon_min:
+            raise ValueError("bounds 必须满足 lat_min < lat_max 且 lon_min < lon_max")
+        self.bounds = (lat_min, lon_min, lat_max, lon_max)
+        self.depth = depth
+        self.n_cells = 1 << depth # 最细层每边网格数
+        self.counts = [np.zeros((1 << L, 1 << L), dtype=np.int32) for L in range(depth + 1)]
+
+        # 每个点所在的最细层网格坐标 (x: 经度方向, y: 纬度方向)
+        self._cx = np.empty(0, dtype=np.int64)
+        self._cy = np.empty(0, dtype=np.int64)
+        self._active = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return int(self._active.sum())
+
+    # ==========================================
+    # 增量维护
+    # ==========================================
+    def _cells(self, lats, lons):
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        n = self.n_cells
+        cx = np.floor((np.asarray(lons, dtype=np.float64) - lon_min) / (lon_max - lon_min) * n)
+        cy = np.floor((np.asarray(lats, dtype=np.float64) - lat_min) / (lat_max - lat_min) * n)
+        return np.clip(cx, 0, n - 1).astype(np.int64), np.clip(cy, 0, n - 1).astype(np.int64)
+
+    def _add(self, cx, cy, delta):
+        for L in range(self.depth + 1):
+            s = self.depth - L
+            np.add.at(self.counts[L], (cy >> s, cx >> s), delta)
+
+    def insert(self, lats, lons):
+        """加入一批位置，返回其编号数组"""
+        cx, cy = self._cells(np.atleast_1d(lats), np.atleast_1d(lons))
+        start = len(self._cx)
+        self._cx = np.concatenate([self._cx, cx])
+        self._cy = np.concatenate([self._cy, cy])
+        self._active = np.concatenate([self._active, np.ones(len(cx), dtype=bool)])
+        self._add(cx, cy, 1)
+        return np.arange(start, start + len(cx))
+
+    def update(self, ids, lats, lons):
+        """
+        批量移动: 只有跨越网格边界的点会修改对应层的计数
+        同一编号在一次调用中出现多次时以最后一个位置为准
+        """
+        ids = np.atleast_1d(ids)
+        if not self._active[ids].all():
+            raise KeyError("存在已删除或未插入的编号")
+        new_x, new_y = self._cells(np.broadcast_to(lats, ids.shape), np.broadcast_to(lons, ids.shape))
+        # 去重 (保留最后一次出现)，否则同一点的旧网格会被重复减计数
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = len(ids) - 1 - last
+        ids, new_x, new_y = ids[keep], new_x[keep], new_y[keep]
+        old_x, old_y = self._cx[ids], self._cy[ids]
+
+        for L in range(self.depth, -1, -1):
+            s = self.depth - L
+            m = ((old_x >> s) != (new_x >> s)) | ((old_y >> s) != (new_y >> s))
+            if not m.any():
+                break # 在较细层未跨格，则更粗的层也不会跨格
+            np.add.at(self.counts[L], (old_y[m] >> s, old_x[m] >> s), -1)
+            np.add.at(self.counts[L], (new_y[m] >> s, new_x[m] >> s), 1)
+
+        self._cx[ids] = new_x
+        self._cy[ids] = new_y
+
+    def remove(self, ids):
+        """批量删除 (重复编号与已删除的编号忽略)"""
+        ids = np.unique(ids)
+        ids = ids[self._active[ids]]
+        self._add(self._cx[ids], self._cy[ids], -1)
+        self._active[ids] = False
+
+    # ==========================================
+    # 隐匿查询
+    # ==========================================
+    def cloak(self, ids, k):
+        """
+        批量隐匿: ids 为点编号数组，k 为标量或逐点数组
+        返回 (bboxes, counts):
+        bboxes (n, 4) 为 [lon_min, lat_min, lon_max, lat_max]，counts 为框内实际人数；
+        社区总人数不足 k 时返回整个社区范围 (counts < k)
+        """
+        ids = np.atleast_1d(ids)
+        k = np.broadcast_to(np.asarray(k), ids.shape)
+        cx, cy = self._cx[ids], self._cy[ids]
+
+        n = len(ids)
+        x0 = np.empty(n, dtype=np.int64) # 以最细层网格为单位的矩形
+        y0 = np.empty(n, dtype=np.int64)
+        nx = np.empty(n, dtype=np.int64)
+        ny = np.empty(n, dtype=np.int64)
+        counts = np.empty(n, dtype=np.int64)
+
+        todo = np.arange(n)
+        for L in range(self.depth, -1, -1):
+            s = self.depth - L
+            c = self.counts[L]
+            x, y, kk = cx[todo] >> s, cy[todo] >> s, k[todo]
+            own = c[y, x]
+
+            done = own >= kk
+            if L == 0:
+                done[:] = True # 根网格兜底
+            rx, ry = x.copy(), y.copy()
+            wx, wy = np.ones_like(x), np.ones_like(y)
+            total = own.astype(np.int64)
+
+            if L > 0:
+                # 兄弟网格合并: 水平 (同一父网格的左右两格) / 垂直 (上下两格)
+                h = own + c[y, x ^ 1]
+                v = own + c[y ^ 1, x]
+                h_ok = ~done & (h >= kk)
+                v_ok = ~done & (v >= kk)
+                use_h = h_ok & (~v_ok | (h <= v)) # 两者都满足时取人数较少者
+                use_v = v_ok & ~use_h
+                rx[use_h] &= ~1
+                wx[use_h] = 2
+                total[use_h] = h[use_h]
+                ry[use_v] &= ~1
+                wy[use_v] = 2
+                total[use_v] = v[use_v]
+                done |= use_h | use_v
+
+            idx = todo[done]
+            x0[idx] = rx[done] << s
+            y0[idx] = ry[done] << s
+            nx[idx] = wx[done] << s
+            ny[idx] = wy[done] << s
+            counts[idx] = total[done]
+            todo = todo[~done]
+            if not todo.size:
+                break
+
+        lat_min, lon_min, lat_max, lon_max = self.bounds
+        dx = (lon_max - lon_min) / self.n_cells
+        dy = (lat_max - lat_min) / self.n_cells
+        bboxes = np.stack([
+            lon_min + x0 * dx, lat_min + y0 * dy,
+            lon_min + (x0 + nx) * dx, lat_min + (y0 + ny) * dy,
+        ], axis=1)
+        return bboxes, counts
@@ -3,19 +3,34 @@ import numpy as np
 from collections import deque
 from config import ENTROPY_THRESHOLD, ENTROPY_PENALTY_COEF, WINDOW_SIZE
 
+N_BINS = 5       # 动态离散化区间数
+MIN_SAMPLES = 5  # 窗口内样本不足时不计算
+
 class StabilityAnalyzer:
     """
     基于信息熵的时序稳定性分析
     对应文档：2.4 基于信息熵的时序稳定性分析
     """
-    def __init__(self, threshold=ENTROPY_THRESHOLD):
+    def __init__(self, threshold=ENTROPY_THRESHOLD, incremental=False):
         self.window = deque(maxlen=WINDOW_SIZE)
         self.threshold = threshold
 
+        # 增量模式: 单调队列维护 min/max，区间计数随样本进出窗口更新
+        self.incremental = incremental
+        self._seq = 0                 # 样本序号 (用于判断单调队列队首是否已出窗)
+        self._min_q = deque()         # (seq, value)，value 单调递增
+        self._max_q = deque()         # (seq, value)，value 单调递减
+        self._edges = None            # 当前计数所基于的区间边界
+        self._widths = None
+        self._counts = np.zeros(N_BINS, dtype=np.intp)
+
     def update_and_calculate(self, new_value):
         """
         更新窗口并计算熵值
         """
+        if self.incremental:
+            return self._update_incremental(new_value)
+
         self.window.append(new_value)
         
         if len(self.window) < 5:
@@ -38,4 +53,107 @@ class StabilityAnalyzer:
         excess = max(0, entropy - self.threshold)
         penalty = excess * ENTROPY_PENALTY_COEF
         
-        return entropy, penalty
\ No newline at end of file
+        return entropy, penalty
+
+    # ==========================================
+    # 增量模式 (O(1) 每帧)
+    # ==========================================
+    def _update_incremental(self, new_value):
+        """
+        与 update_and_calculate 结果逐位一致的增量实现:
+        极值不变时只移出/移入两个样本的区间计数，极值变化时按新边界精确重新分箱
+        """
+        value = float(new_value)
+        leaving = self.window[0] if len(self.window) == self.window.maxlen else None
+        self.window.append(value)
+
+        # 1. 单调队列维护窗口 min/max
+        seq = self._seq
+        self._seq += 1
+        oldest = seq - len(self.window) + 1
+        for q, worse in ((self._min_q, lambda a, b: a >= b), (self._max_q, lambda a, b: a <= b)):
+            while q and worse(q[-1][1], value):
+                q.pop()
+            q.append((seq, value))
+            while q[0][0] < oldest:
+                q.popleft()
+        d_min, d_max = self._min_q[0][1], self._max_q[0][1]
+
+        if len(self.window) < MIN_SAMPLES or d_max == d_min:
+            self._edges = None
+            return 0.0, 0.0
+
+        # 2. 区间计数: 边界未变则 O(1) 更新，否则精确重新分箱 (O(W))
+        edges = self._edges
+        if edges is not None and edges[0] == d_min and edges[-1] == d_max:
+            if leaving is not None:
+                self._counts[_bin_index(leaving, edges)] -= 1
+            self._counts[_bin_index(value, edges)] += 1
+        else:
+            edges = np.linspace(d_min, d_max, N_BINS + 1)
+            self._edges = edges
+            self._widths = np.diff(edges)
+            self._counts[:] = 0
+            for v in self.window:
+                self._counts[_bin_index(v, edges)] += 1
+
+        # 3. 熵与罚分 (与 np.histogram(density=True) 相同的归一化顺序)
+        hist = self._counts / self._widths / self._counts.sum()
+        probs = hist / np.sum(hist)
+        probs = probs[probs > 0]
+        entropy = -np.sum(probs * np.log2(probs))
+
+        excess = max(0, entropy - self.threshold)
+        penalty = excess * ENTROPY_PENALTY_COEF
+        return entropy, penalty
+
+
+def _bin_index(value, edges):
+    """复现 np.histogram 等宽分箱的下标计算 (含边界 1 ULP 修正，最后一个区间右闭)"""
+    lo, hi = edges[0], edges[-1]
+    idx = int((value - lo) / (hi - lo) * N_BINS)
+    if idx == N_BINS:
+        idx -= 1
+    if value < edges[idx]:
+        idx -= 1
+    if idx != N_BINS - 1 and value >= edges[idx + 1]:
+        idx += 1
+    return idx
+
+
+def batch_entropy(windows, threshold=ENTROPY_THRESHOLD):
+    """
+    批量版熵计算: 一次向量化调用处理 N 位老人的滑动窗口
+    windows: (N, W) 数组，每行为一位老人的窗口样本 (行内顺序无关)
+    返回: (entropy, penalty) 两个 (N,) 数组，与逐个 update_and_calculate 结果逐位一致
+    """
+    w = np.asarray(windows, dtype=np.float64)
+    n_rows, n_samples = w.shape
+    entropy = np.zeros(n_rows)
+    if n_samples < MIN_SAMPLES or n_rows == 0:
+        return entropy, np.zeros(n_rows)
+
+    d_min, d_max = w.min(axis=1), w.max(axis=1)
+    valid = d_max != d_min
+    w, d_min, d_max = w[valid], d_min[valid], d_max[valid]
+    rows = np.arange(len(w))[:, None]
+
+    # 1. 动态离散化: 每行独立的等宽边界 (与 np.histogram 相同的下标计算与修正)
+    edges = np.linspace(d_min, d_max, N_BINS + 1, axis=-1)
+    idx = ((w - d_min[:, None]) / (d_max - d_min)[:, None] * N_BINS).astype(np.intp)
+    idx[idx == N_BINS] -= 1
+    idx[w < edges[rows, idx]] -= 1
+    idx[(w >= edges[rows, idx + 1]) & (idx != N_BINS - 1)] += 1
+
+    counts = np.bincount((idx + rows * N_BINS).ravel(), minlength=len(w) * N_BINS)
+    counts = counts.reshape(len(w), N_BINS)
+
+    # 2. 香农熵
+    hist = counts / np.diff(edges, axis=-1) / counts.sum(axis=1, keepdims=True)
+    probs = hist / hist.sum(axis=1, keepdims=True)
+    safe = np.where(probs > 0, probs, 1.0)
+    entropy[valid] = -np.sum(probs * np.log2(safe), axis=1)
+
+    # 3. 罚分
+    penalty = np.maximum(0, entropy - threshold) * ENTROPY_PENALTY_COEF
+    return entropy, penalty
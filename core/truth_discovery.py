@@ -7,10 +7,23 @@ class TruthDiscovery:
     实现基于 KL 散度的跨模态真值发现
     对应文档：2.2 多源异构数据的真值发现
     """
-    def __init__(self, sensitivity=KL_SENSITIVITY):
+    # 传感器分布 P(x) 只有三种取值: 正常 / 亚健康 / 极度危险 (按心率分档)
+    HR_BAND_PROBS = np.array([
+        [0.90, 0.08, 0.02],
+        [0.30, 0.60, 0.10],
+        [0.05, 0.35, 0.60],
+    ])
+
+    def __init__(self, sensitivity=KL_SENSITIVITY, max_count=3):
         self.lambda_param = sensitivity
         self.states = ["Normal", "Risk", "Fall"] # 状态空间
 
+        # 预计算查找表: (心率分档, Normal 数, Risk 数, Fall 数) -> 置信度 / KL
+        self.max_count = max_count
+        self._table_lambda = None
+        self._table_conf = None
+        self._table_kl = None
+
     def _sensor_to_prob(self, hr_val):
         """
         将连续传感器数值映射为概率分布 P(x)
@@ -23,6 +36,17 @@ class TruthDiscovery:
         else:
             return np.array([0.05, 0.35, 0.60]) # 极度危险/跌倒倾向
 
+    def _hr_band(self, hr_values):
+        """心率分档 (标量或数组)，与 _sensor_to_prob 的分支一一对应 (0 正常 / 1 亚健康 / 2 危险)"""
+        if np.ndim(hr_values) == 0:
+            if 60 <= hr_values <= 100: return 0
+            elif 50 < hr_values < 60 or 100 < hr_values < 120: return 1
+            return 2
+        hr = np.asarray(hr_values, dtype=np.float64)
+        normal = (hr >= 60) & (hr <= 100)
+        sub = ((hr > 50) & (hr < 60)) | ((hr > 100) & (hr < 120))
+        return np.where(normal, 0, np.where(sub, 1, 2))
+
     def _crowd_to_prob(self, labels):
         """
         将离散文本标签映射为概率分布 Q(x)
@@ -35,19 +59,75 @@ class TruthDiscovery:
         raw = np.array([counts[s] + 0.1 for s in self.states])
         return raw / np.sum(raw)
 
+    def _kl_confidence(self, P, Q):
+        """KL(P||Q) 与置信度，沿最后一维计算 (标量与批量共用同一公式)"""
+        epsilon = 1e-9
+        kl_value = np.sum(P * np.log((P + epsilon) / (Q + epsilon)), axis=-1)
+        confidence = 1.0 / (1.0 + self.lambda_param * kl_value)
+        return confidence, kl_value
+
+    def build_trust_table(self):
+        """
+        预计算 (心率分档 × 三类标签计数) 的置信度/KL 查找表
+        λ 变化后在下一次查询时自动重建
+        """
+        m = self.max_count + 1
+        counts = np.stack(np.meshgrid(np.arange(m), np.arange(m), np.arange(m), indexing="ij"), axis=-1)
+        raw = counts + 0.1 # 拉普拉斯平滑
+        Q = raw / np.sum(raw, axis=-1, keepdims=True)
+        P = self.HR_BAND_PROBS[:, None, None, None, :]
+
+        self._table_conf, self._table_kl = self._kl_confidence(P, Q[None])
+        self._table_lambda = self.lambda_param
+
+    def _ensure_table(self):
+        if self._table_lambda != self.lambda_param:
+            self.build_trust_table()
+
     def compute_trust_score(self, sensor_val, crowd_labels):
         """
-        [旧接口] 使用标签列表计算
+        [旧接口] 使用标签列表计算 (计数在表范围内时直接查表)
         """
+        counts = [0, 0, 0]
+        for l in crowd_labels:
+            if l in self.states: counts[self.states.index(l)] += 1
+
+        if max(counts) <= self.max_count:
+            self._ensure_table()
+            key = (self._hr_band(sensor_val),) + tuple(counts)
+            return self._table_conf[key], self._table_kl[key]
+
         P = self._sensor_to_prob(sensor_val)
         Q = self._crowd_to_prob(crowd_labels)
-        
-        epsilon = 1e-9
-        kl_value = np.sum(P * np.log((P + epsilon) / (Q + epsilon)))
-        confidence = 1.0 / (1.0 + self.lambda_param * kl_value)
-        
+        return self._kl_confidence(P, Q)
+
+    def compute_trust_batch(self, sensor_vals, crowd_counts):
+        """
+        [批量接口] 心率数组 (N,) + 标签计数 (N, 3) -> 置信度、KL 数组 (N,)
+        表范围内为一次 gather，超出 max_count 的行回退到精确计算
+        """
+        self._ensure_table()
+        band = self._hr_band(sensor_vals)
+        counts = np.asarray(crowd_counts, dtype=np.intp)
+
+        in_table = (counts <= self.max_count).all(axis=-1)
+        safe = np.where(in_table[..., None], counts, 0)
+        key = (band, safe[..., 0], safe[..., 1], safe[..., 2])
+        confidence, kl_value = self._table_conf[key], self._table_kl[key]
+
+        if not in_table.all():
+            raw = counts[~in_table] + 0.1
+            Q = raw / np.sum(raw, axis=-1, keepdims=True)
+            confidence[~in_table], kl_value[~in_table] = self._kl_confidence(self.HR_BAND_PROBS[band[~in_table]], Q)
         return confidence, kl_value
 
+    def compute_trust_with_distribution_batch(self, sensor_vals, Q_distributions):
+        """
+        [批量接口] 任意 NLP 分布 Q (N, 3) 的精确路径
+        """
+        P = self.HR_BAND_PROBS[self._hr_band(sensor_vals)]
+        return self._kl_confidence(P, np.asarray(Q_distributions, dtype=np.float64))
+
     # ==========================================
     # 👇 必须补上这个新方法 👇
     # ==========================================
@@ -68,4 +148,111 @@ class TruthDiscovery:
         # 4. 计算置信度
         confidence = 1.0 / (1.0 + self.lambda_param * kl_value)
         
-        return confidence, kl_value
\ No newline at end of file
+        return confidence, kl_value
+
+class CRHTruthDiscovery:
+    """
+    多志愿者迭代真值发现 (CRH 风格)
+    在稀疏的 志愿者 × 老人 × 时刻 报告矩阵上，交替估计:
+      1. 每位老人每个时刻的潜在状态分布 (按志愿者可靠度加权投票)
+      2. 每位志愿者的可靠度权重 w_k = log(Σ loss / loss_k)
+    历史损失按 decay 衰减累计，新报告到达时从当前权重热启动，无需从头求解
+    - 志愿者少于 2 名时可靠度没有可比对象 (log(Σ/loss) 恒为 0)，不做重加权，权重保持为 1
+    - 权重下限为 min_weight，避免全部权重为 0 时投票退化为均匀分布
+    - 报告中出现 >= n_volunteers 的志愿者编号时自动扩展，新志愿者从先验开始
+    - 每次 update 只用本批报告估计本批 (老人, 时刻) 的真值: 同一键的报告分在不同批次到达时不会合并
+      (后到批次得到只含新报告的独立估计，但会使用已学到的可靠度)；需要合并时应按时刻收齐后一次提交
+    """
+    def __init__(self, n_volunteers, sensitivity=KL_SENSITIVITY, n_iter=10, decay=0.95,
+                 smoothing=0.1, prior_loss=0.5, prior_count=1.0, tol=1e-6, min_weight=1e-3):
+        self.base = TruthDiscovery(sensitivity) # 复用 KL 置信度计算
+        self.states = self.base.states
+        self.n_iter = n_iter
+        self.decay = decay
+        self.smoothing = smoothing
+        self.tol = tol
+        self.min_weight = min_weight
+
+        # 先验: 新志愿者视为中等可靠 (相当于 prior_count 条损失为 prior_loss 的报告)
+        self.prior_loss = prior_loss
+        self.prior_count = prior_count
+
+        self.weights = np.ones(n_volunteers)
+        self._loss = np.zeros(n_volunteers)  # 衰减累计损失
+        self._count = np.zeros(n_volunteers) # 衰减累计报告数
+
+    def _encode_labels(self, labels):
+        labels = np.asarray(labels)
+        if labels.dtype.kind in "US":
+            codes = np.full(labels.shape, -1)
+            for i, s in enumerate(self.states):
+                codes[labels == s] = i
+            return codes
+        return labels.astype(np.intp)
+
+    def _grow(self, n):
+        """报告中出现新的志愿者编号时扩展状态数组，新志愿者从先验开始 (权重 1、无历史损失)"""
+        extra = n - len(self.weights)
+        if extra > 0:
+            self.weights = np.concatenate([self.weights, np.ones(extra)])
+            self._loss = np.concatenate([self._loss, np.zeros(extra)])
+            self._count = np.concatenate([self._count, np.zeros(extra)])
+
+    def _vote(self, inv, vol, lab, weights, n_keys):
+        """可靠度加权投票 + 平滑 -> (n_keys, 3) 状态分布"""
+        votes = np.zeros((n_keys, len(self.states)))
+        np.add.at(votes, (inv, lab), weights[vol])
+        return (votes + self.smoothing) / np.sum(votes + self.smoothing, axis=1, keepdims=True)
+
+    def update(self, volunteers, residents, ticks, labels):
+        """
+        增量更新: 输入一批新报告 (COO 四元组数组，labels 为标签字符串或状态编码)
+        返回: dict，resident/tick 为本批涉及的 (老人, 时刻) 键，distribution 为对应的 (M, 3) 状态分布
+        """
+        vol = np.asarray(volunteers, dtype=np.intp)
+        lab = self._encode_labels(labels)
+        known = lab >= 0 # 状态空间外的标签忽略
+        vol, lab = vol[known], lab[known]
+        res, tck = np.asarray(residents)[known], np.asarray(ticks)[known]
+        if vol.size:
+            self._grow(vol.max() + 1)
+
+        # (老人, 时刻) 键去重，得到每条报告所属的潜在真值下标
+        keys, inv = np.unique(np.stack([res, tck], axis=1), axis=0, return_inverse=True)
+        inv = inv.ravel()
+        n_keys, n_vol = len(keys), len(self.weights)
+        batch_count = np.bincount(vol, minlength=n_vol)
+
+        weights = self.weights
+        for _ in range(self.n_iter):
+            # 1. 真值估计: 可靠度加权投票 + 平滑
+            dist = self._vote(inv, vol, lab, weights, n_keys)
+
+            # 2. 可靠度估计: 志愿者报告与当前真值的不一致程度 (1 - Q[报告标签])
+            batch_loss = np.bincount(vol, weights=1.0 - dist[inv, lab], minlength=n_vol)
+            mean_loss = (self._loss + batch_loss + self.prior_loss * self.prior_count) / \
+                        (self._count + batch_count + self.prior_count)
+            if n_vol < 2:
+                break # 单一来源: 不重加权，dist 即平滑后的投票
+            new_weights = np.maximum(np.log(np.sum(mean_loss) / mean_loss), self.min_weight)
+
+            converged = np.max(np.abs(new_weights - weights)) < self.tol
+            weights = new_weights
+            if converged:
+                break
+        if n_vol >= 2:
+            # 返回的真值与最终权重一致 (循环内的 dist 由上一轮权重得到)
+            dist = self._vote(inv, vol, lab, weights, n_keys)
+
+        # 3. 热启动状态: 衰减累计历史损失，保留当前权重
+        self._loss = self._loss * self.decay + batch_loss
+        self._count = self._count * self.decay + batch_count
+        self.weights = weights
+
+        return {"resident": keys[:, 0], "tick": keys[:, 1], "distribution": dist}
+
+    def confidence(self, sensor_vals, distributions):
+        """
+        传感器分布 P 与估计真值分布 Q 的 KL 置信度 (即 CareDecision.evaluate 使用的 trust_conf)
+        """
+        return self.base.compute_trust_with_distribution_batch(sensor_vals, distributions)
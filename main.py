@@ -1,79 +1,101 @@
+# main.py
+"""
+无界面批处理入口: 不做节流，全速运行指定场景 / 健康档案 / 时长 / 老人数，
+日志数组保存为 .npz (每个字段形状为 (老人数, 时刻数)，time 为 (时刻数,))，字段与 Visualizer.plot_dashboard 一致
+数据来自 PopulationSimulator (float32、整体向量化取随机数)，与逐人 RealTimeSimulator 的场景逻辑相同、
+统计上等价，但随机数顺序不同，结果不与界面逐位一致
+
+用法: python main.py --scenario Infarction --profile Hypertension --duration 600 --residents 100 --seed 0 --out simulation_log.npz --plot
+      python main.py --duration 86400 --residents 64 --report-dir reports --workers 8   (无界面并行绘制每位老人的报告)
+"""
+import argparse
 import sys
-import os
+import time
+
 import numpy as np
-from config import *
-from simulation.generator import DataGenerator
-from core.truth_discovery import TruthDiscovery
-from core.stability import StabilityAnalyzer
-from core.decision import CareDecision
-from core.privacy import PrivacyModule
-from utils.visualization import Visualizer
-
-def main():
-    print(f"Starting ACAS Simulation (Duration: {SIMULATION_DURATION})...")
-    
-    # 1. 初始化模块
-    gen = DataGenerator(duration=SIMULATION_DURATION)
-    truth_finder = TruthDiscovery(sensitivity=KL_SENSITIVITY)
-    stability_analyzer = StabilityAnalyzer(threshold=ENTROPY_THRESHOLD, delta=DELTA)
-    decision_maker = CareDecision(base_score=BASE_HEALTH_SCORE)
-    privacy_module = PrivacyModule(k=K_ANONYMITY_VAL)
-    
-    # 2. 生成仿真数据 (D_sensor)
-    # 设定：中间时段(40-70)发生心律失常风险
-    hr_stream = gen.generate_heart_rate_stream(risk_period=(40, 70))
-    
-    # 存储结果用于分析
-    simulation_log = {
-        'time': [], 'hr': [], 'entropy': [], 'kl_div': [], 
-        'q_val': [], 'score': [], 'level': [], 'privacy_area': []
-    }
-    
-    # 3. 时间步循环
-    for t in range(len(hr_stream)):
-        current_hr = hr_stream[t]
-        
-        # --- A. 隐私保护层 (Privacy Layer) ---
-        # 模拟位置泛化，计算匿名区域面积
-        anon_area = privacy_module.generalize_location((0, 0)) # 假设原点为中心
-        
-        # --- B. 数据清洗层 (Truth Discovery) ---
-        # 模拟志愿者数据 (D_crowd)：在风险时段，真实状态为1(Risk)
-        real_status = 1 if (40 <= t <= 70) else 0
-        crowd_labels = gen.generate_crowd_data(t, real_status)
-        
-        # 计算分布与KL散度
-        P = truth_finder.sensor_to_distribution(current_hr)
-        Q = truth_finder.labels_to_distribution(crowd_labels)
-        kl_div, q_val = truth_finder.compute_confidence(P, Q)
-        
-        # --- C. 状态评估层 (Stability Assessment) ---
-        # 获取滑动窗口数据
-        start_idx = max(0, t - WINDOW_SIZE)
-        window_data = hr_stream[start_idx : t+1]
-        
-        entropy_val = stability_analyzer.compute_shannon_entropy(window_data)
-        penalty = stability_analyzer.calculate_penalty(entropy_val)
-        
-        # --- D. 决策层 (Decision Making) ---
-        score = decision_maker.calculate_total_score(q_val, penalty)
-        level = decision_maker.apply_hysteresis(score)
-        
-        # 记录日志
-        simulation_log['time'].append(t)
-        simulation_log['hr'].append(current_hr)
-        simulation_log['entropy'].append(entropy_val)
-        simulation_log['kl_div'].append(kl_div)
-        simulation_log['q_val'].append(q_val)
-        simulation_log['score'].append(score)
-        simulation_log['level'].append(1 if level == "L4" else 0)
-        simulation_log['privacy_area'].append(anon_area)
-
-    # 4. 结果可视化
-    print("Simulation finished. Generating report figures...")
-    viz = Visualizer()
-    viz.plot_dashboard(simulation_log)
-    print("Done.")
+
+from config import DEFAULT_K, KL_SENSITIVITY, ENTROPY_THRESHOLD
+from core.engine import CareEngine, population_source
+from simulation.generator import PopulationSimulator
+from simulation.actors import DEFAULT_PROFILES
+
+PROFILES = {p.condition: p for p in DEFAULT_PROFILES}
+LOG_FIELDS = ("hr", "entropy", "kl_div", "q_val", "score", "level", "privacy_area")
+
+# 老人默认坐标 (与界面一致)
+HOME = (31.939, 118.790)
+
+
+def run_batch(scenario, profile, duration, n_residents=1, seed=None, k=DEFAULT_K,
+              sensitivity=KL_SENSITIVITY, threshold=ENTROPY_THRESHOLD):
+    """
+    全速运行并返回 (log, elapsed_s)
+    log: {"time": (T,), 其余字段: (N, T)}；level 为 0/1 (L3/L4)，privacy_area 为匿名框面积 (度²)
+    """
+    sim = PopulationSimulator(n_residents, scenario, seed=seed)
+    engine = CareEngine(n_residents, profiles=[profile] * n_residents,
+                        coords=np.tile(HOME, (n_residents, 1)),
+                        k=k, sensitivity=sensitivity, threshold=threshold, seed=seed)
+
+    log = {"time": np.zeros(duration, dtype=np.int64)}
+    for name in LOG_FIELDS:
+        log[name] = np.zeros((n_residents, duration), dtype=np.int8 if name == "level" else np.float64)
+
+    start = time.perf_counter()
+    for j, result in enumerate(engine.run(population_source(sim, duration))):
+        log["time"][j] = result.t
+        log["hr"][:, j] = result.states.hr
+        log["entropy"][:, j] = result.entropy
+        log["kl_div"][:, j] = result.kl_div
+        log["q_val"][:, j] = result.confidence
+        log["score"][:, j] = result.score
+        log["level"][:, j] = result.level
+        log["privacy_area"][:, j] = result.privacy_area # 由隐私层的 bbox 数组向量化计算
+    return log, time.perf_counter() - start
+
+
+def resident_log(log, i):
+    """取出第 i 位老人的一维日志 (plot_dashboard 的输入格式)"""
+    return {name: values if name == "time" else values[i] for name, values in log.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ACAS 无界面批处理仿真")
+    parser.add_argument("--scenario", default="Infarction", choices=PopulationSimulator.SCENARIOS)
+    parser.add_argument("--profile", default="Healthy", choices=list(PROFILES), help="健康档案 (病史)")
+    parser.add_argument("--duration", type=int, default=100, help="时长 (时刻数)")
+    parser.add_argument("--residents", type=int, default=1, help="老人数 (同一场景与档案的独立个体)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="simulation_log.npz", help="日志数组输出路径")
+    parser.add_argument("--plot", action="store_true", help="绘制第 0 位老人的报告图 (弹出窗口)")
+    parser.add_argument("--report-dir", default=None, help="批量报告目录: 非交互后端并行绘制每位老人的报告")
+    parser.add_argument("--workers", type=int, default=None, help="报告绘制进程数")
+    parser.add_argument("--dpi", type=int, default=150, help="批量报告分辨率")
+    parser.add_argument("--max-points", type=int, default=2000, help="批量报告每条曲线的最大点数 (LTTB 降采样)")
+    args = parser.parse_args(argv)
+
+    print(f"Starting ACAS batch simulation: {args.scenario} / {args.profile} | "
+          f"{args.residents} residents x {args.duration} ticks")
+    log, elapsed = run_batch(args.scenario, PROFILES[args.profile], args.duration, args.residents, args.seed)
+    np.savez(args.out, **log)
+
+    resident_ticks = args.residents * args.duration
+    print(f"{args.duration} ticks in {elapsed:.2f} s: {args.duration / elapsed:,.0f} ticks/s "
+          f"({resident_ticks / elapsed:,.0f} resident-ticks/s) -> {args.out}")
+    l4 = log["level"].any(axis=1).mean()
+    print(f"L4 reached by {l4:.0%} of residents, mean score {log['score'].mean():.1f}")
+
+    if args.plot:
+        from utils.visualization import Visualizer
+        Visualizer().plot_dashboard(resident_log(log, 0))
+    if args.report_dir:
+        from utils.visualization import render_reports
+        start = time.perf_counter()
+        paths = render_reports(log, args.report_dir, workers=args.workers, dpi=args.dpi,
+                               max_points=args.max_points)
+        print(f"{len(paths)} reports rendered in {time.perf_counter() - start:.1f} s -> {args.report_dir}")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,3 +1,3 @@
 # simulation/__init__.py
-from .actors import HolographicState, Elderly
-from .generator import RealTimeSimulator
\ No newline at end of file
+from .actors import HolographicState, HolographicColumns, HolographicStateView, Elderly, UserProfile, DEFAULT_PROFILES
+from .generator import RealTimeSimulator, PopulationSimulator
@@ -1,10 +1,18 @@
 # simulation/actors.py
+import numpy as np
+from config import LOCATIONS
+
+# 群智标签状态空间 (与 TruthDiscovery.states 顺序一致，crowd_counts 的列顺序)
+CROWD_STATES = ["Normal", "Risk", "Fall"]
 
 class HolographicState:
     """
     四维全息感知数据模型 (2.0 Enhanced)
     对应文档：摘要及1.3节
     """
+    __slots__ = ("base_score", "hr", "spo2", "bp_sys", "bp_dia", "temp", "resp_rate", "gsr",
+                 "location", "crowd_labels", "shock")
+
     def __init__(self, base_score, hr, spo2, bp_sys, bp_dia, temp, resp_rate, gsr, location, crowd_labels, shock):
         # --- 1. Profile ---
         self.base_score = base_score
@@ -27,6 +35,123 @@ class HolographicState:
         # --- 4. Interrupt ---
         self.shock = shock            # 加速度冲击
 
+
+def _column_property(name):
+    """行视图字段 -> 列数组对应元素 (读出为 Python float，与 HolographicState 行为一致)"""
+    def fget(self):
+        return float(getattr(self._cols, name)[self._i])
+
+    def fset(self, value):
+        getattr(self._cols, name)[self._i] = value
+
+    return property(fget, fset)
+
+
+class HolographicStateView:
+    """
+    列式存储的轻量行视图 (__slots__，无 __dict__)
+    提供与 HolographicState 相同的属性，CareDecision.evaluate 等现有调用方无需修改
+    """
+    __slots__ = ("_cols", "_i")
+
+    def __init__(self, cols, i):
+        self._cols = cols
+        self._i = i
+
+    base_score = _column_property("base_score")
+    hr = _column_property("hr")
+    spo2 = _column_property("spo2")
+    bp_sys = _column_property("bp_sys")
+    bp_dia = _column_property("bp_dia")
+    temp = _column_property("temp")
+    resp_rate = _column_property("resp_rate")
+    gsr = _column_property("gsr")
+
+    @property
+    def location(self):
+        return LOCATIONS[self._cols.location[self._i]]
+
+    @location.setter
+    def location(self, value):
+        self._cols.location[self._i] = LOCATIONS.index(value)
+
+    @property
+    def shock(self):
+        return int(self._cols.shock[self._i])
+
+    @shock.setter
+    def shock(self, value):
+        self._cols.shock[self._i] = value
+
+    @property
+    def crowd_labels(self):
+        # 由计数还原标签列表 (顺序无意义，消费方只做计数)
+        labels = []
+        for state, count in zip(CROWD_STATES, self._cols.crowd_counts[self._i]):
+            labels.extend([state] * int(count))
+        return labels
+
+
+class HolographicColumns:
+    """
+    列式全息状态存储 (Struct-of-Arrays)
+    每个字段一列 float32/int8 数组；位置为 LOCATIONS 编码，群智标签为 [Normal, Risk, Fall] 计数
+    单条约 37 字节，相比逐帧 HolographicState 对象 (含浮点对象与标签 list) 小一个数量级
+    """
+    FLOAT_FIELDS = ("base_score", "hr", "spo2", "bp_sys", "bp_dia", "temp", "resp_rate", "gsr")
+
+    def __init__(self, n):
+        self.n = n
+        for name in self.FLOAT_FIELDS:
+            setattr(self, name, np.zeros(n, dtype=np.float32))
+        self.location = np.zeros(n, dtype=np.int8)
+        self.shock = np.zeros(n, dtype=np.int8)
+        self.crowd_counts = np.zeros((n, len(CROWD_STATES)), dtype=np.int8)
+
+    @classmethod
+    def from_batch(cls, batch, tick):
+        """
+        从 PopulationSimulator.generate 的输出中取第 tick 列 (全体老人同一时刻)
+        """
+        cols = cls(len(batch["hr"]))
+        cols.base_score[:] = batch["base_score"]
+        for name in cls.FLOAT_FIELDS[1:]:
+            getattr(cols, name)[:] = batch[name][:, tick]
+        cols.location[:] = batch["location"][:, tick]
+        cols.shock[:] = batch["shock"][:, tick]
+        cols.crowd_counts[:] = batch["crowd_counts"][:, tick]
+        return cols
+
+    @classmethod
+    def from_states(cls, states):
+        """由 HolographicState 列表打包为列式存储"""
+        cols = cls(len(states))
+        for i, s in enumerate(states):
+            for name in cls.FLOAT_FIELDS:
+                getattr(cols, name)[i] = getattr(s, name)
+            cols.location[i] = LOCATIONS.index(s.location)
+            cols.shock[i] = s.shock
+            for label in s.crowd_labels:
+                if label in CROWD_STATES:
+                    cols.crowd_counts[i, CROWD_STATES.index(label)] += 1
+        return cols
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.__dict__.values() if isinstance(a, np.ndarray))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        return HolographicStateView(self, i % self.n)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield HolographicStateView(self, i)
+
 class Elderly:
     """用户实体类"""
     def __init__(self, uid, name, chronic_diseases):
@@ -56,4 +181,12 @@ class UserProfile:
             elif condition == "Alzheimer":
                 self.base_score = 80.0
             else:
-                self.base_score = 90.0
\ No newline at end of file
+                self.base_score = 90.0
+
+
+# 标准健康档案 (界面、批处理与参数扫描共用)
+DEFAULT_PROFILES = [
+    UserProfile("张三", 65, "Healthy"),
+    UserProfile("李四", 72, "Hypertension"),
+    UserProfile("王五", 78, "Alzheimer"),
+]
@@ -1,15 +1,22 @@
 # simulation/generator.py
 import numpy as np
-import random
+from config import LOCATIONS
+from utils.seeding import resident_generators, ResidentStreams
 from .actors import HolographicState
 
 class RealTimeSimulator:
     """
     全维生理信号生成器 (2.0 Enhanced)
     支持6种医学/生活场景：Normal, Arrhythmia, Fall, Exercise, Hypoglycemia, Infarction
+    seed: 给定时体征与群智标签分别取自该老人独立的随机流 (utils.seeding)，否则沿用全局 np.random
     """
-    def __init__(self):
+    def __init__(self, seed=None, resident_id=0):
         self.t = 0
+        if seed is None:
+            self.rng = self.crowd_rng = np.random
+        else:
+            self.rng = resident_generators(seed, "vitals", [resident_id])[0]
+            self.crowd_rng = resident_generators(seed, "crowd", [resident_id])[0]
         
     def stream_generator(self, scenario_mode="Normal"):
         # === 0. 初始化基准值 (健康态) ===
@@ -25,13 +32,13 @@ class RealTimeSimulator:
             self.t += 1
             
             # === 1. 生成基础波动 (高斯噪声) ===
-            curr_hr = base_hr + np.random.normal(0, 2)
-            curr_spo2 = base_spo2 + np.random.normal(0, 0.5)
-            curr_sys = base_sys + np.random.normal(0, 3)
-            curr_dia = base_dia + np.random.normal(0, 2)
-            curr_temp = base_temp + np.random.normal(0, 0.1)
-            curr_rr = base_rr + np.random.normal(0, 1)
-            curr_gsr = base_gsr + np.random.normal(0, 0.2)
+            curr_hr = base_hr + self.rng.normal(0, 2)
+            curr_spo2 = base_spo2 + self.rng.normal(0, 0.5)
+            curr_sys = base_sys + self.rng.normal(0, 3)
+            curr_dia = base_dia + self.rng.normal(0, 2)
+            curr_temp = base_temp + self.rng.normal(0, 0.1)
+            curr_rr = base_rr + self.rng.normal(0, 1)
+            curr_gsr = base_gsr + self.rng.normal(0, 0.2)
             
             curr_shock = 0
             curr_loc = "Bedroom" # 默认位置
@@ -42,7 +49,7 @@ class RealTimeSimulator:
             if scenario_mode == "Arrhythmia": 
                 # [心律失常]: 心率波动大，体温微升
                 if (self.t % 40) > 20:
-                    curr_hr += np.random.normal(20, 10) # 熵增来源
+                    curr_hr += self.rng.normal(20, 10) # 熵增来源
                     curr_sys += 10
                     curr_temp += 0.4
                 curr_loc = "LivingRoom"
@@ -53,12 +60,12 @@ class RealTimeSimulator:
                 if self.t > 20:
                     if self.t == 21: curr_shock = 1
                     if self.t <= 30: # 剧痛期
-                        curr_hr = 125 + np.random.normal(0, 5)
-                        curr_sys = 165 + np.random.normal(0, 5)
-                        curr_gsr = 15.0 + np.random.normal(0, 2) # 痛
+                        curr_hr = 125 + self.rng.normal(0, 5)
+                        curr_sys = 165 + self.rng.normal(0, 5)
+                        curr_gsr = 15.0 + self.rng.normal(0, 2) # 痛
                     else: # 昏迷期
-                        curr_sys = 85 + np.random.normal(0, 5) # 低血压
-                        curr_spo2 = 88 + np.random.normal(0, 2)
+                        curr_sys = 85 + self.rng.normal(0, 5) # 低血压
+                        curr_spo2 = 88 + self.rng.normal(0, 2)
             
             # --- B. 新增高级场景 (Context-Aware) ---
             
@@ -67,9 +74,9 @@ class RealTimeSimulator:
                 # 特征: HR极高, BP高, 但 GSR低(无痛), SpO2好
                 curr_loc = "Park" # 关键上下文
                 if self.t > 10:
-                    curr_hr = 135 + np.random.normal(0, 5) # 看起来很危险
-                    curr_sys = 155 + np.random.normal(0, 5) # 运动性高血压
-                    curr_rr = 28 + np.random.normal(0, 2)   # 气喘吁吁
+                    curr_hr = 135 + self.rng.normal(0, 5) # 看起来很危险
+                    curr_sys = 155 + self.rng.normal(0, 5) # 运动性高血压
+                    curr_rr = 28 + self.rng.normal(0, 2)   # 气喘吁吁
                     curr_spo2 = 99.0 # 深呼吸供氧极好
                     curr_gsr = 3.0   # 只是出汗，没有痛感尖峰
             
@@ -78,9 +85,9 @@ class RealTimeSimulator:
                 # 特征: 冷汗(GSR高+体温低), 心悸
                 curr_loc = "Bedroom"
                 if self.t > 15:
-                    curr_gsr = 12.0 + np.random.normal(0, 1) # 冷汗 (关键特征)
-                    curr_temp = 35.8 + np.random.normal(0, 0.1) # 体表湿冷
-                    curr_hr = 115 + np.random.normal(0, 5) # 心悸
+                    curr_gsr = 12.0 + self.rng.normal(0, 1) # 冷汗 (关键特征)
+                    curr_temp = 35.8 + self.rng.normal(0, 0.1) # 体表湿冷
+                    curr_hr = 115 + self.rng.normal(0, 5) # 心悸
                     curr_sys = 110 # 血压甚至略低
             
             elif scenario_mode == "Infarction":
@@ -88,11 +95,11 @@ class RealTimeSimulator:
                 # 特征: 濒死感(GSR极高), 休克(BP低), 缺氧
                 curr_loc = "LivingRoom"
                 if self.t > 20:
-                    curr_gsr = 25.0 + np.random.normal(0, 3) # 剧烈胸痛 (爆表)
-                    curr_sys = 80 + np.random.normal(0, 5)   # 心源性休克
-                    curr_spo2 = 91 + np.random.normal(0, 1)  # 缺氧
+                    curr_gsr = 25.0 + self.rng.normal(0, 3) # 剧烈胸痛 (爆表)
+                    curr_sys = 80 + self.rng.normal(0, 5)   # 心源性休克
+                    curr_spo2 = 91 + self.rng.normal(0, 1)  # 缺氧
                     curr_rr = 30 # 呼吸急促
-                    curr_hr = 100 + np.random.normal(0, 20) # 极度不稳定
+                    curr_hr = 100 + self.rng.normal(0, 20) # 极度不稳定
             
             # === 3. 边界限制 ===
             curr_spo2 = min(100, max(60, curr_spo2))
@@ -106,9 +113,9 @@ class RealTimeSimulator:
             visible_risk = (curr_shock == 1) or (curr_gsr > 18) or (curr_loc=="Bathroom" and curr_sys < 90)
             
             for _ in range(3):
-                if random.random() < 0.6:
+                if self.crowd_rng.random() < 0.6:
                     report = "Risk" if visible_risk else "Normal"
-                    if random.random() > 0.95: report = "Normal" if report == "Risk" else "Risk" # 误报
+                    if self.crowd_rng.random() > 0.95: report = "Normal" if report == "Risk" else "Risk" # 误报
                     crowd_labels.append(report)
             
             # === 5. 封装 ===
@@ -120,4 +127,165 @@ class RealTimeSimulator:
                 location=curr_loc, crowd_labels=crowd_labels, shock=curr_shock
             )
             
-            yield state, self.t
\ No newline at end of file
+            yield state, self.t
+
+
+class PopulationSimulator:
+    """
+    群体级向量化生成器 (Population Batch)
+    一次调用生成 N 位老人 × T 个时刻的全部体征、冲击、位置与群智标签计数 (NumPy 数组)
+    六大场景通过布尔掩码注入，统计特性与 RealTimeSimulator.stream_generator 逐帧版本一致
+    """
+    SCENARIOS = ("Normal", "Arrhythmia", "Fall_Bathroom", "Exercise", "Hypoglycemia", "Infarction")
+    N_VOLUNTEERS = 3
+
+    def __init__(self, n_residents, scenario_mode="Normal", rng=None, dtype=np.float32,
+                 seed=None, resident_ids=None):
+        self.n_residents = n_residents
+        self.t = 0
+        self.dtype = dtype
+        # 随机源: 默认沿用全局 np.random，也可传入 np.random.Generator
+        # 给定 seed 时每位老人使用独立的体征/群智随机流 (按全局编号 resident_ids 派生)，
+        # 社区按任意方式分片运行，每位老人的数据都与整体运行逐位一致
+        if seed is not None and rng is not None:
+            raise ValueError("seed 与 rng 只能指定其一")
+        self.rng = rng if rng is not None else np.random
+        self.resident_ids = np.arange(n_residents) if resident_ids is None else np.asarray(resident_ids)
+        if len(self.resident_ids) != n_residents:
+            raise ValueError("resident_ids 长度必须等于 n_residents")
+        self._streams = None
+        if seed is not None:
+            self._streams = (ResidentStreams(seed, "vitals", self.resident_ids),
+                             ResidentStreams(seed, "crowd", self.resident_ids))
+
+        # 每位老人一个场景 (str 表示全体同一场景)
+        if isinstance(scenario_mode, str):
+            scenario_mode = [scenario_mode] * n_residents
+        self.scenarios = np.asarray(scenario_mode)
+        if self.scenarios.shape != (n_residents,):
+            raise ValueError("scenario_mode 长度必须等于 n_residents")
+
+    @staticmethod
+    def _masked_normal(rng, mask, mean, std):
+        """掩码内元素的 N(mean, std) 样本 (一维，顺序同 arr[mask])"""
+        if isinstance(rng, ResidentStreams):
+            # 逐人随机流: 计数器按整块前进，样本与其他老人的场景无关
+            return mean + rng.normal(0, std, mask.shape, mask=mask)
+        return mean + rng.normal(0, std, int(mask.sum()))
+
+    @classmethod
+    def _override(cls, rng, arr, mask, mean, std):
+        """仅对掩码内的元素重新采样: arr[mask] = N(mean, std)"""
+        if isinstance(rng, ResidentStreams) or mask.any():
+            arr[mask] = cls._masked_normal(rng, mask, mean, std)
+
+    def generate(self, n_ticks):
+        """
+        生成下一段 n_ticks 个时刻的数据 (时间轴与 stream_generator 一致，从 t=1 开始连续递增)
+        返回: dict，体征/冲击/位置为 (N, T) 数组，crowd_counts 为 (N, T, 3) 的 [Normal, Risk, Fall] 计数
+        """
+        t = self.t + 1 + np.arange(n_ticks)
+        self.t += n_ticks
+        if self._streams is None:
+            return self._generate(self.rng, self.rng, self.scenarios, t)
+        # 逐人随机流 (计数器式)，整个社区仍一次向量化生成
+        return self._generate(*self._streams, self.scenarios, t)
+
+    def _generate(self, rng, crowd_rng, scenarios, t):
+        n_ticks = len(t)
+        shape = (len(scenarios), n_ticks)
+
+        # === 1. 生成基础波动 (高斯噪声) ===
+        hr = 75.0 + rng.normal(0, 2, shape)
+        spo2 = 98.0 + rng.normal(0, 0.5, shape)
+        bp_sys = 120.0 + rng.normal(0, 3, shape)
+        dia = 80.0 + rng.normal(0, 2, shape)
+        temp = 36.6 + rng.normal(0, 0.1, shape)
+        rr = 16.0 + rng.normal(0, 1, shape)
+        gsr = 2.0 + rng.normal(0, 0.2, shape)
+
+        shock = np.zeros(shape, dtype=np.int8)
+        loc = np.full(shape, LOCATIONS.index("Bedroom"), dtype=np.int8)
+
+        # === 2. 场景注入逻辑 (掩码版) ===
+        def mask(name, time_cond):
+            return (scenarios == name)[:, None] & time_cond[None, :]
+
+        always = np.ones(n_ticks, dtype=bool)
+
+        # --- A. 心律失常: 周期性心率剧烈波动 ---
+        m = mask("Arrhythmia", (t % 40) > 20)
+        hr[m] += self._masked_normal(rng, m, 20, 10)
+        bp_sys[m] += 10
+        temp[m] += 0.4
+        loc[mask("Arrhythmia", always)] = LOCATIONS.index("LivingRoom")
+
+        # --- B. 浴室跌倒: 冲击 -> 剧痛 -> 休克 ---
+        loc[mask("Fall_Bathroom", always)] = LOCATIONS.index("Bathroom")
+        shock[mask("Fall_Bathroom", t == 21)] = 1
+        m = mask("Fall_Bathroom", (t > 20) & (t <= 30))
+        self._override(rng, hr, m, 125, 5)
+        self._override(rng, bp_sys, m, 165, 5)
+        self._override(rng, gsr, m, 15.0, 2)
+        m = mask("Fall_Bathroom", t > 30)
+        self._override(rng, bp_sys, m, 85, 5)
+        self._override(rng, spo2, m, 88, 2)
+
+        # --- C. 高强度运动: 假报警测试 ---
+        loc[mask("Exercise", always)] = LOCATIONS.index("Park")
+        m = mask("Exercise", t > 10)
+        self._override(rng, hr, m, 135, 5)
+        self._override(rng, bp_sys, m, 155, 5)
+        self._override(rng, rr, m, 28, 2)
+        spo2[m] = 99.0
+        gsr[m] = 3.0
+
+        # --- D. 夜间低血糖: 冷汗 + 心悸 ---
+        m = mask("Hypoglycemia", t > 15)
+        self._override(rng, gsr, m, 12.0, 1)
+        self._override(rng, temp, m, 35.8, 0.1)
+        self._override(rng, hr, m, 115, 5)
+        bp_sys[m] = 110
+
+        # --- E. 急性心梗: 剧痛 + 休克 + 缺氧 ---
+        loc[mask("Infarction", always)] = LOCATIONS.index("LivingRoom")
+        m = mask("Infarction", t > 20)
+        self._override(rng, gsr, m, 25.0, 3)
+        self._override(rng, bp_sys, m, 80, 5)
+        self._override(rng, spo2, m, 91, 1)
+        rr[m] = 30
+        self._override(rng, hr, m, 100, 20)
+
+        # === 3. 边界限制 ===
+        np.clip(spo2, 60, 100, out=spo2)
+        np.maximum(gsr, 0, out=gsr)
+        np.maximum(bp_sys, 50, out=bp_sys)
+
+        # === 4. 群智感知 (3 名志愿者，60% 概率上报，5% 误报) ===
+        visible_risk = (shock == 1) | (gsr > 18) | ((loc == LOCATIONS.index("Bathroom")) & (bp_sys < 90))
+        reported = crowd_rng.random(shape + (self.N_VOLUNTEERS,)) < 0.6
+        flipped = crowd_rng.random(shape + (self.N_VOLUNTEERS,)) > 0.95
+        says_risk = visible_risk[..., None] ^ flipped
+
+        crowd_counts = np.zeros(shape + (3,), dtype=np.int8)
+        crowd_counts[..., 0] = (reported & ~says_risk).sum(axis=-1)
+        crowd_counts[..., 1] = (reported & says_risk).sum(axis=-1)
+
+        # === 5. 封装 ===
+        dt = self.dtype
+        return {
+            "t": t,
+            "base_score": np.full(len(scenarios), 95.0, dtype=dt),
+            "hr": hr.astype(dt), "spo2": spo2.astype(dt),
+            "bp_sys": bp_sys.astype(dt), "bp_dia": dia.astype(dt),
+            "temp": temp.astype(dt), "resp_rate": rr.astype(dt), "gsr": gsr.astype(dt),
+            "location": loc, "crowd_counts": crowd_counts, "shock": shock,
+        }
+
+    def iter_chunks(self, n_ticks, chunk_ticks=3600):
+        """分块生成长时段数据 (如一整天)，控制峰值内存"""
+        remaining = n_ticks
+        while remaining > 0:
+            step = min(chunk_ticks, remaining)
+            remaining -= step
+            yield self.generate(step)
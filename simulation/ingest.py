@@ -0,0 +1,418 @@
+# simulation/ingest.py
+"""
+外部传感器数据本地接入 (UDP 行协议)
+每个数据报包含一行或多行 (以 \\n 分隔)，每行是一位老人的一次部分更新:
+    <resident_id> <t> hr=78.2,spo2=97.5,bp_sys=121,loc=Bathroom,shock=1,crowd=Risk,crowd=Normal,ts=1712345678.12
+- 体征字段: hr / spo2 / bp_sys / bp_dia / temp / resp_rate / gsr (未出现的字段沿用该老人上一次的值)
+- loc: LOCATIONS 中的位置名；shock=1 为冲击事件；crowd 为一条志愿者上报 (可重复出现)
+- ts: 设备发送时刻 (Unix 秒，可选)，用于统计传输延迟
+
+接收线程解析后写入有界队列，过载时按策略丢弃或合并:
+- drop_oldest: 队列满时丢弃最旧的消息
+- drop_newest: 队列满时丢弃新到的消息
+- coalesce:    同一老人的待处理消息合并为一条 (体征取最新、冲击取或、志愿者上报累加)，队列长度不超过老人数
+
+Ingestor.tick() 把截至当前的更新汇总为 HolographicColumns (与 PopulationSimulator 输出同构)，
+可直接作为 CareEngine / AsyncCarePipeline 的数据源
+
+用法 (本地假设备集群压测): python -m simulation.ingest --residents 1000 --rate 50000 --duration 5 --policy coalesce
+"""
+import argparse
+import multiprocessing as mp
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from config import LOCATIONS
+from core.instrumentation import LogHistogram
+from .actors import HolographicColumns, CROWD_STATES
+from .generator import PopulationSimulator
+
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+_VITALS = {name.encode(): name for name in HolographicColumns.FLOAT_FIELDS[1:]}
+_LOCATION_CODES = {name.encode(): i for i, name in enumerate(LOCATIONS)}
+_CROWD_CODES = {name.encode(): i for i, name in enumerate(CROWD_STATES)}
+
+
+def parse_line(line):
+    """
+    解析一行 -> (resident, t, vitals dict, location 编码或 None, shock, 志愿者上报编码列表, 发送时刻或 None)
+    格式错误时抛出 ValueError / KeyError
+    """
+    rid, t, body = line.split(b" ", 2)
+    vitals = {}
+    location = None
+    shock = 0
+    crowd = []
+    ts = None
+    for item in body.split(b","):
+        key, value = item.split(b"=", 1)
+        if key in _VITALS:
+            vitals[_VITALS[key]] = float(value)
+        elif key == b"crowd":
+            crowd.append(_CROWD_CODES[value])
+        elif key == b"loc":
+            location = _LOCATION_CODES[value]
+        elif key == b"shock":
+            shock = int(value)
+        elif key == b"ts":
+            ts = float(value)
+        else:
+            raise KeyError(key)
+    return int(rid), int(t), vitals, location, shock, crowd, ts
+
+
+def encode_line(resident, t, vitals=None, location=None, shock=0, crowd=(), ts=None):
+    """生成一行协议文本 (bytes，不含换行)"""
+    parts = [f"{k}={v:.6g}" for k, v in (vitals or {}).items()]
+    if location is not None:
+        parts.append(f"loc={location}")
+    if shock:
+        parts.append("shock=1")
+    parts.extend(f"crowd={c}" for c in crowd)
+    if ts is not None:
+        parts.append(f"ts={ts:.6f}")
+    return f"{resident} {t} {','.join(parts)}".encode()
+
+
+class IngestQueue:
+    """
+    接收线程与汇总之间的有界队列
+    元素为 [resident, t, vitals, location, shock, crowd, ts, recv_time]
+    coalesce 策略按老人合并: 体征与位置以 t 较大的报文为准 (乱序到达的旧报文只补充缺失字段)，
+    冲击与志愿者上报累积
+    """
+    def __init__(self, maxlen=65536, policy="coalesce"):
+        if policy not in POLICIES:
+            raise ValueError(f"未知过载策略: {policy} (可选: {', '.join(POLICIES)})")
+        self.maxlen = maxlen
+        self.policy = policy
+        self._items = OrderedDict() if policy == "coalesce" else deque()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, msg):
+        with self._lock:
+            items = self._items
+            if self.policy == "coalesce":
+                pending = items.get(msg[0])
+                if pending is not None:
+                    if msg[1] >= pending[1]:
+                        # 较新的报文: 覆盖体征与位置
+                        pending[1] = msg[1]
+                        pending[2].update(msg[2])
+                        if msg[3] is not None:
+                            pending[3] = msg[3]
+                    else:
+                        # 迟到的旧报文: 只补充尚未上报的体征，不覆盖较新的读数
+                        for name, value in msg[2].items():
+                            pending[2].setdefault(name, value)
+                        if pending[3] is None:
+                            pending[3] = msg[3]
+                    # 冲击与志愿者上报是事件，无论先后都累积
+                    pending[4] |= msg[4]
+                    pending[5].extend(msg[5])
+                    # 发送/接收时刻保留最早一条，延迟统计反映合并消息中最旧的数据
+                    self.coalesced += 1
+                    self.accepted += 1
+                    return True
+                if len(items) >= self.maxlen:
+                    items.popitem(last=False)
+                    self.dropped += 1
+                items[msg[0]] = msg
+            elif len(items) >= self.maxlen:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                items.popleft()
+                self.dropped += 1
+                items.append(msg)
+            else:
+                items.append(msg)
+            self.accepted += 1
+            return True
+
+    def drain(self):
+        """取出全部待处理消息 (按到达顺序)"""
+        with self._lock:
+            items = self._items
+            self._items = OrderedDict() if self.policy == "coalesce" else deque()
+        return list(items.values()) if self.policy == "coalesce" else list(items)
+
+
+class Ingestor:
+    """
+    UDP 接入端: 接收线程负责收包、解析、入队；tick() 在消费方线程中汇总为列式批次
+    """
+    def __init__(self, n_residents, host="127.0.0.1", port=0, policy="coalesce", maxlen=65536,
+                 recv_buffer=4 << 20):
+        self.n_residents = n_residents
+        self.queue = IngestQueue(maxlen, policy)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+        self._sock.bind((host, port))
+        self._sock.settimeout(0.2)
+        self._stop = threading.Event()
+        self._thread = None
+
+        # 每位老人的最新状态 (未上报前为健康基线) 与本时刻内累积的事件
+        self._state = HolographicColumns(n_residents)
+        baseline = {"base_score": 95.0, "hr": 75.0, "spo2": 98.0, "bp_sys": 120.0, "bp_dia": 80.0,
+                    "temp": 36.6, "resp_rate": 16.0, "gsr": 2.0}
+        for name, value in baseline.items():
+            getattr(self._state, name)[:] = value
+        self._crowd = np.zeros((n_residents, len(CROWD_STATES)), dtype=np.int32)
+        self._shock = np.zeros(n_residents, dtype=np.int8)
+        self.last_t = np.zeros(n_residents, dtype=np.int64)
+        self._tick = 0
+
+        # 统计
+        self.datagrams = 0
+        self.received = 0
+        self.parse_errors = 0
+        self.rejected = 0      # 老人编号越界
+        self.applied = 0
+        self.transit_lag = LogHistogram() # 设备发送 -> 接收
+        self.queue_lag = LogHistogram()   # 接收 -> 汇总
+        self._started_at = None
+        self._rate_mark = (time.perf_counter(), 0)
+        self.recent_rate = 0.0
+
+    @property
+    def address(self):
+        return self._sock.getsockname()
+
+    # ==========================================
+    # 接收线程
+    # ==========================================
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._rate_mark = (self._started_at, 0)
+        self._thread = threading.Thread(target=self._recv_loop, name="ingest-udp", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sock.close()
+
+    def _recv_loop(self):
+        sock, put, n = self._sock, self.queue.put, self.n_residents
+        while not self._stop.is_set():
+            try:
+                data = sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            now = time.time()
+            self.datagrams += 1
+            for line in data.split(b"\n"):
+                if not line:
+                    continue
+                self.received += 1
+                try:
+                    msg = parse_line(line)
+                except (ValueError, KeyError):
+                    self.parse_errors += 1
+                    continue
+                if not 0 <= msg[0] < n:
+                    self.rejected += 1
+                    continue
+                put([*msg, now])
+
+    # ==========================================
+    # 汇总 (消费方线程)
+    # ==========================================
+    def poll(self):
+        """把队列中的消息应用到各老人的最新状态，返回本次应用的消息数"""
+        messages = self.queue.drain()
+        now = time.time()
+        state, crowd, shock, last_t = self._state, self._crowd, self._shock, self.last_t
+        for rid, t, vitals, location, shk, reports, ts, recv_time in messages:
+            if t >= last_t[rid]:
+                # 早于该老人已应用读数的迟到报文不覆盖体征与位置 (事件仍计入)
+                for name, value in vitals.items():
+                    getattr(state, name)[rid] = value
+                if location is not None:
+                    state.location[rid] = location
+            if shk:
+                shock[rid] = 1
+            for c in reports:
+                crowd[rid, c] += 1
+            if t > last_t[rid]:
+                last_t[rid] = t
+            if ts is not None:
+                self.transit_lag.observe(max(recv_time - ts, 0.0))
+            self.queue_lag.observe(now - recv_time)
+        self.applied += len(messages)
+        return len(messages)
+
+    def tick(self):
+        """
+        汇总一个时刻: 返回 (HolographicColumns, t)
+        体征为各老人最新值；冲击与志愿者上报为上一时刻以来的累积 (随后清零)
+        """
+        self.poll()
+        self._tick += 1
+        cols = HolographicColumns(self.n_residents)
+        for name in HolographicColumns.FLOAT_FIELDS:
+            getattr(cols, name)[:] = getattr(self._state, name)
+        cols.location[:] = self._state.location
+        cols.shock[:] = self._shock
+        np.minimum(self._crowd, np.iinfo(np.int8).max, out=cols.crowd_counts, casting="unsafe")
+        self._shock[:] = 0
+        self._crowd[:] = 0
+
+        now = time.perf_counter()
+        mark_time, mark_count = self._rate_mark
+        if now > mark_time and self.received > mark_count:
+            # 只按收到消息的窗口更新: 数据流结束后保留最后一个非空窗口的速率
+            self.recent_rate = (self.received - mark_count) / (now - mark_time)
+        self._rate_mark = (now, self.received)
+        return cols, self._tick
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "datagrams": self.datagrams,
+            "received": self.received,
+            "accepted": self.queue.accepted,
+            "applied": self.applied,
+            "dropped": self.queue.dropped,
+            "coalesced": self.queue.coalesced,
+            "parse_errors": self.parse_errors,
+            "rejected": self.rejected,
+            "queue_depth": len(self.queue),
+            "rate_msgs_s": self.received / elapsed if elapsed else 0.0,
+            "recent_rate_msgs_s": self.recent_rate,
+            "transit_lag_p50_ms": self.transit_lag.percentile(50) * 1e3,
+            "transit_lag_p99_ms": self.transit_lag.percentile(99) * 1e3,
+            "queue_lag_p50_ms": self.queue_lag.percentile(50) * 1e3,
+            "queue_lag_p99_ms": self.queue_lag.percentile(99) * 1e3,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def ingest_source(ingestor, max_ticks=None):
+    """列式数据源: 每次取用时汇总一个时刻 (节奏由消费方决定，如 AsyncCarePipeline 的 tick_interval)"""
+    n = 0
+    while max_ticks is None or n < max_ticks:
+        yield ingestor.tick()
+        n += 1
+
+
+class FakeDeviceFleet:
+    """
+    本地假设备集群: 用 PopulationSimulator 生成 n_residents 位老人的数据，编码为行协议，
+    多行打包为数据报 (不超过 datagram_bytes)，按目标消息速率发送
+    """
+    def __init__(self, address, n_residents, scenario_mode="Normal", seed=0, datagram_bytes=1400):
+        self.address = tuple(address)
+        self.n_residents = n_residents
+        self.sim = PopulationSimulator(n_residents, scenario_mode, seed=seed)
+        self.datagram_bytes = datagram_bytes
+        self.sent = 0
+
+    def _tick_lines(self, batch, j):
+        lines = []
+        ts = time.time()
+        for i in range(self.n_residents):
+            vitals = {name: float(batch[name][i, j]) for name in HolographicColumns.FLOAT_FIELDS[1:]}
+            counts = batch["crowd_counts"][i, j]
+            crowd = [CROWD_STATES[c] for c in range(len(CROWD_STATES)) for _ in range(int(counts[c]))]
+            lines.append(encode_line(i, int(batch["t"][j]), vitals, LOCATIONS[batch["location"][i, j]],
+                                     int(batch["shock"][i, j]), crowd, ts))
+        return lines
+
+    def _datagrams(self, lines):
+        buf, size = [], 0
+        for line in lines:
+            if size + len(line) + 1 > self.datagram_bytes and buf:
+                yield b"\n".join(buf)
+                buf, size = [], 0
+            buf.append(line)
+            size += len(line) + 1
+        if buf:
+            yield b"\n".join(buf)
+
+    def run(self, rate, duration):
+        """以约 rate 条/秒发送 duration 秒，返回发送的消息数"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.perf_counter()
+        end = start + duration
+        batch, j = self.sim.generate(60), 0
+        while time.perf_counter() < end:
+            if j == len(batch["t"]):
+                batch, j = self.sim.generate(60), 0
+            lines = self._tick_lines(batch, j)
+            j += 1
+            for dgram in self._datagrams(lines):
+                sock.sendto(dgram, self.address)
+            self.sent += len(lines)
+            # 速率控制: 领先计划时等待
+            ahead = self.sent / rate - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+        sock.close()
+        return self.sent
+
+
+def _fleet_process(address, n_residents, rate, duration, seed, result):
+    result.put(FakeDeviceFleet(address, n_residents, seed=seed).run(rate, duration))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UDP 接入压测 (本地假设备集群)")
+    parser.add_argument("--residents", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=50000, help="目标消息速率 (条/秒)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--policy", default="coalesce", choices=POLICIES)
+    parser.add_argument("--maxlen", type=int, default=65536)
+    parser.add_argument("--tick-interval", type=float, default=0.25, help="汇总间隔 (秒)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with Ingestor(args.residents, policy=args.policy, maxlen=args.maxlen) as ingestor:
+        result = mp.Queue()
+        fleet = mp.Process(target=_fleet_process, daemon=True, args=(
+            ingestor.address, args.residents, args.rate, args.duration, args.seed, result))
+        fleet.start()
+        ticks = 0
+        while fleet.is_alive():
+            time.sleep(args.tick_interval)
+            ingestor.tick()
+            ticks += 1
+        time.sleep(args.tick_interval)
+        ingestor.tick()
+        sent = result.get()
+        stats = ingestor.stats()
+
+    print(f"sent {sent} | received {stats['received']} ({stats['received'] / max(sent, 1):.1%}) | "
+          f"{stats['received'] / args.duration:,.0f} msgs/s over {ticks} ticks")
+    for key, value in stats.items():
+        print(f"  {key:<22} {value:,.2f}" if isinstance(value, float) else f"  {key:<22} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
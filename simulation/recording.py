@@ -0,0 +1,241 @@
+# simulation/recording.py
+"""
+仿真流列式录制与全速回放
+目录布局 (可内存映射):
+    run_dir/
+        manifest.json                 字段 dtype/形状、分块时间范围
+        chunk_00000/hr.npy ...        每块每字段一个 .npy，形状 (块内时刻数, N, ...)
+录制内容: 输入体征 (HolographicColumns 各列)、群智标签计数、语义输入 (BERT 分布 / 语音罚分与中断 / SOS)
+与引擎输出 (熵、罚分、置信度、KL 散度、评分、等级、切换、中断)
+时刻 t 为 None 的结果按录制序号 (从 0 起) 记录，保证块内时间单调递增
+"""
+import json
+import os
+
+import numpy as np
+
+from config import RECORDING_CHUNK_BYTES, RECORDING_MAX_CHUNK_TICKS
+from .actors import HolographicColumns, CROWD_STATES
+
+FORMAT_VERSION = 1
+
+# 字段: (dtype, 每位老人的尾部形状)
+INPUT_FIELDS = {name: ("float32", ()) for name in HolographicColumns.FLOAT_FIELDS}
+INPUT_FIELDS.update({
+    "location": ("int8", ()),
+    "shock": ("int8", ()),
+    "crowd_counts": ("int8", (len(CROWD_STATES),)),
+})
+SEMANTIC_FIELDS = {
+    "crowd_dist": ("float64", (len(CROWD_STATES),)), # NaN 表示无 BERT 分布
+    "voice_penalty": ("float64", ()),
+    "voice_interrupt": ("bool", ()),
+    "sos": ("bool", ()),
+}
+OUTPUT_FIELDS = {
+    "entropy": ("float64", ()),
+    "entropy_penalty": ("float64", ()),
+    "confidence": ("float64", ()),
+    "kl_div": ("float64", ()),
+    "score": ("float64", ()),
+    "level": ("int8", ()),
+    "changed": ("bool", ()),
+    "interrupt": ("bool", ()),
+}
+FIELDS = {**INPUT_FIELDS, **SEMANTIC_FIELDS, **OUTPUT_FIELDS}
+
+
+class Recorder:
+    """
+    按块录制引擎结果流: 每满 chunk_ticks 个时刻写出一个分块目录并更新 manifest
+    chunk_ticks 缺省时按字节预算确定: 缓冲总大小不超过 chunk_bytes (至少 1 个时刻，至多 RECORDING_MAX_CHUNK_TICKS)
+    用法:
+        with Recorder("runs/exp1", n_residents=N) as rec:
+            for result in engine.run(source):
+                rec.record(result, engine)
+    """
+    def __init__(self, path, n_residents, chunk_ticks=None, resident_ids=None, meta=None,
+                 chunk_bytes=RECORDING_CHUNK_BYTES):
+        self.path = path
+        self.n_residents = n_residents
+        if chunk_ticks is None:
+            chunk_ticks = min(RECORDING_MAX_CHUNK_TICKS, max(1, chunk_bytes // self.row_bytes(n_residents)))
+        self.chunk_ticks = chunk_ticks
+        os.makedirs(path, exist_ok=True)
+
+        self.manifest = {
+            "version": FORMAT_VERSION,
+            "n_residents": n_residents,
+            "resident_ids": (np.arange(n_residents) if resident_ids is None
+                             else np.asarray(resident_ids)).tolist(),
+            "fields": {name: {"dtype": dt, "shape": list(shape)} for name, (dt, shape) in FIELDS.items()},
+            "chunks": [],
+            "meta": meta or {},
+        }
+        self._buf = {name: np.zeros((chunk_ticks, n_residents) + shape, dtype=dt)
+                     for name, (dt, shape) in FIELDS.items()}
+        self._t = np.zeros(chunk_ticks, dtype=np.int64)
+        self._fill = 0
+        self._n_recorded = 0 # 已录制的时刻数 (跨分块)
+        self._write_manifest()
+
+    @staticmethod
+    def row_bytes(n_residents):
+        """一个时刻全部字段的字节数"""
+        return 8 + n_residents * sum(np.dtype(dt).itemsize * int(np.prod(shape, dtype=np.int64))
+                                     for dt, shape in FIELDS.values())
+
+    def record(self, result, engine=None):
+        """
+        记录一个 TickResult；传入 engine 时同时记录该时刻生效的语义输入
+        (须在 engine.step 之后、下一次修改语义输入之前调用)
+        """
+        j = self._fill
+        cols = result.states
+        for name in HolographicColumns.FLOAT_FIELDS:
+            self._buf[name][j] = getattr(cols, name)
+        self._buf["location"][j] = cols.location
+        self._buf["shock"][j] = cols.shock
+        self._buf["crowd_counts"][j] = cols.crowd_counts
+
+        if engine is not None:
+            self._buf["crowd_dist"][j] = engine.crowd_dist
+            self._buf["voice_penalty"][j] = engine.voice_penalty
+            self._buf["voice_interrupt"][j] = engine.voice_interrupt
+            self._buf["sos"][j] = engine.sos
+        else:
+            self._buf["crowd_dist"][j] = np.nan
+
+        for name in OUTPUT_FIELDS:
+            self._buf[name][j] = getattr(result, name)
+        self._t[j] = self._n_recorded if result.t is None else result.t
+
+        self._n_recorded += 1
+        self._fill += 1
+        if self._fill == self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        """写出当前未满的分块 (下一个时刻开始新块)"""
+        if not self._fill:
+            return
+        index = len(self.manifest["chunks"])
+        name = f"chunk_{index:05d}"
+        chunk_dir = os.path.join(self.path, name)
+        os.makedirs(chunk_dir, exist_ok=True)
+        n = self._fill
+        np.save(os.path.join(chunk_dir, "t.npy"), self._t[:n])
+        for field, arr in self._buf.items():
+            np.save(os.path.join(chunk_dir, f"{field}.npy"), arr[:n])
+        self.manifest["chunks"].append({
+            "dir": name, "n_ticks": n, "t_start": int(self._t[0]), "t_end": int(self._t[n - 1]),
+        })
+        self._fill = 0
+        self._write_manifest()
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class Recording:
+    """
+    录制读取: 分块 .npy 以内存映射方式打开，按老人与时间范围随机读取只触及相关分块
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != FORMAT_VERSION:
+            raise ValueError(f"不支持的录制格式版本: {self.manifest['version']}")
+        self.n_residents = self.manifest["n_residents"]
+        self.resident_ids = np.asarray(self.manifest["resident_ids"])
+        self.chunks = self.manifest["chunks"]
+        self._mmap = "r" if mmap else None
+
+    @property
+    def n_ticks(self):
+        return sum(c["n_ticks"] for c in self.chunks)
+
+    @property
+    def fields(self):
+        return list(self.manifest["fields"])
+
+    def _load(self, chunk, field):
+        return np.load(os.path.join(self.path, chunk["dir"], f"{field}.npy"), mmap_mode=self._mmap)
+
+    def _chunks_in(self, t_start, t_end):
+        for c in self.chunks:
+            if (t_start is None or c["t_end"] >= t_start) and (t_end is None or c["t_start"] <= t_end):
+                yield c
+
+    def _rows(self, chunk, t_start, t_end):
+        """分块内落在 [t_start, t_end] 的行: 返回 (t, 行切片)"""
+        t = np.asarray(self._load(chunk, "t"))
+        lo = 0 if t_start is None else int(np.searchsorted(t, t_start, side="left"))
+        hi = len(t) if t_end is None else int(np.searchsorted(t, t_end, side="right"))
+        return t[lo:hi], slice(lo, hi)
+
+    def _read_rows(self, chunk, field, rows, residents):
+        # 时间单调递增，选中行是连续切片: 内存映射下只读取涉及的行
+        values = self._load(chunk, field)[rows]
+        if residents is not None:
+            values = values[:, residents]
+        return np.asarray(values)
+
+    def read(self, field, residents=None, t_start=None, t_end=None):
+        """
+        读取一个字段: 返回 (t, values)，values 形状为 (时刻数, 所选老人数, ...)
+        residents: 老人下标 (录制内的列号) 列表/切片，None 为全部；t_start/t_end 为闭区间
+        """
+        ts, parts = [], []
+        for c in self._chunks_in(t_start, t_end):
+            t, rows = self._rows(c, t_start, t_end)
+            ts.append(t)
+            parts.append(self._read_rows(c, field, rows, residents))
+        if not parts:
+            spec = self.manifest["fields"][field]
+            n = len(np.arange(self.n_residents)[slice(None) if residents is None else residents])
+            return np.zeros(0, dtype=np.int64), np.zeros((0, n) + tuple(spec["shape"]), dtype=spec["dtype"])
+        return np.concatenate(ts), np.concatenate(parts)
+
+    def iter_ticks(self, residents=None, t_start=None, t_end=None):
+        """
+        逐时刻产出 (HolographicColumns, t, semantic)，semantic 为该时刻的语义输入 dict
+        每个分块只读取一次 (时间列载入一次，各字段整块载入内存后逐行切出)
+        """
+        for c in self._chunks_in(t_start, t_end):
+            t_all, rows = self._rows(c, t_start, t_end)
+            data = {field: self._read_rows(c, field, rows, residents)
+                    for field in list(INPUT_FIELDS) + list(SEMANTIC_FIELDS)}
+            for j, t in enumerate(t_all):
+                cols = HolographicColumns(data["hr"].shape[1])
+                for name in INPUT_FIELDS:
+                    getattr(cols, name)[:] = data[name][j]
+                yield cols, int(t), {name: data[name][j] for name in SEMANTIC_FIELDS}
+
+
+def replay(recording, engine, residents=None, t_start=None, t_end=None):
+    """
+    全速回放: 将录制的输入与语义输入逐时刻送入 engine (CareEngine，老人数须等于所选人数)，
+    不做任何节流，逐个产出 TickResult
+    从中途时刻开始回放时，熵窗口从空开始累积，前 WINDOW_SIZE 个时刻的熵与原始运行不同
+    """
+    for cols, t, semantic in recording.iter_ticks(residents, t_start, t_end):
+        engine.crowd_dist[:] = semantic["crowd_dist"]
+        engine.voice_penalty[:] = semantic["voice_penalty"]
+        engine.voice_interrupt[:] = semantic["voice_interrupt"]
+        engine.sos[:] = semantic["sos"]
+        yield engine.step(cols, t)
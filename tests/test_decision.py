@@ -0,0 +1,36 @@
+# tests/test_decision.py
+import numpy as np
+import pytest
+
+from config import LEVELS
+from core.decision import CareDecision, PopulationDecision
+from core.engine import population_source
+from simulation.generator import PopulationSimulator
+
+
+@pytest.mark.parametrize("scenario", ["Infarction", "Fall_Bathroom", "Hypoglycemia"])
+def test_population_matches_per_resident(scenario):
+    n = 16
+    rng = np.random.default_rng(0)
+    population = PopulationDecision(n)
+    residents = [CareDecision() for _ in range(n)]
+    n_changes = 0
+    for cols, _ in population_source(PopulationSimulator(n, scenario, seed=0), 200):
+        conf = rng.random(n)
+        ent_pen = rng.exponential(5.0, n)
+        score, level, changed = population.evaluate(cols, conf, ent_pen)
+        for i, d in enumerate(residents):
+            s, lv, ch = d.evaluate(cols[i], conf[i], ent_pen[i])
+            assert score[i] == s
+            assert LEVELS[level[i]] == lv
+            assert changed[i] == ch
+        n_changes += int(changed.sum())
+    assert n_changes > 0 # 迟滞状态机确实发生了切换
+
+
+def test_evaluate_returns_copy_of_levels():
+    population = PopulationDecision(3)
+    cols = next(population_source(PopulationSimulator(3, "Normal", seed=0), 1))[0]
+    _, level, _ = population.evaluate(cols, np.ones(3), np.zeros(3))
+    level[:] = 1
+    assert not population.levels.any()
@@ -0,0 +1,49 @@
+# tests/test_spatial_index.py
+import numpy as np
+
+from core.spatial_index import GridPyramid
+
+BOUNDS = (31.93, 118.78, 31.95, 118.80)
+
+
+def _check_counts(g):
+    """每层计数之和等于在册人数，且最细层与逐点重建的计数一致"""
+    assert np.all(g.counts[-1] >= 0)
+    for c in g.counts:
+        assert c.sum() == len(g)
+    expected = np.zeros_like(g.counts[-1])
+    np.add.at(expected, (g._cy[g._active], g._cx[g._active]), 1)
+    assert np.array_equal(g.counts[-1], expected)
+
+
+def _pyramid(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    g = GridPyramid(BOUNDS, depth=4)
+    g.insert(rng.uniform(BOUNDS[0], BOUNDS[2], n), rng.uniform(BOUNDS[1], BOUNDS[3], n))
+    return g, rng
+
+
+def test_update_duplicate_ids_keeps_last_position():
+    g, _ = _pyramid()
+    g.update([0, 0], [31.931, 31.949], [118.781, 118.799])
+    _check_counts(g)
+    expected_x, expected_y = g._cells([31.949], [118.799])
+    assert g._cx[0] == expected_x[0] and g._cy[0] == expected_y[0]
+
+
+def test_remove_duplicate_ids():
+    g, _ = _pyramid()
+    g.remove([1, 1])
+    assert len(g) == 49
+    _check_counts(g)
+    g.remove([1, 2])
+    assert len(g) == 48
+    _check_counts(g)
+
+
+def test_random_updates_preserve_counts():
+    g, rng = _pyramid()
+    for _ in range(20):
+        ids = rng.integers(0, 50, 30)
+        g.update(ids, rng.uniform(BOUNDS[0], BOUNDS[2], 30), rng.uniform(BOUNDS[1], BOUNDS[3], 30))
+        _check_counts(g)
@@ -0,0 +1,39 @@
+# tests/test_stability.py
+from collections import deque
+
+import numpy as np
+import pytest
+
+from config import WINDOW_SIZE
+from core.stability import StabilityAnalyzer, batch_entropy
+
+
+def _series(seed, n=600):
+    """心率样序列: 随机游走 + 平台段 (极值相等) + 尖峰 (极值出窗/入窗)"""
+    rng = np.random.default_rng(seed)
+    x = 75 + np.cumsum(rng.normal(0, 1.5, n))
+    x[100:130] = 80.0
+    x[200:260:7] += 40.0
+    x[300:340] = np.round(x[300:340])
+    return x
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_matches_window(seed):
+    window, incremental = StabilityAnalyzer(), StabilityAnalyzer(incremental=True)
+    for v in _series(seed):
+        assert incremental.update_and_calculate(v) == window.update_and_calculate(v)
+
+
+def test_batch_entropy_matches_per_resident():
+    n_residents = 8
+    series = np.stack([_series(seed, 300) for seed in range(n_residents)])
+    analyzers = [StabilityAnalyzer() for _ in range(n_residents)]
+    windows = [deque(maxlen=WINDOW_SIZE) for _ in range(n_residents)]
+    for j in range(series.shape[1]):
+        expected = [a.update_and_calculate(v) for a, v in zip(analyzers, series[:, j])]
+        for w, v in zip(windows, series[:, j]):
+            w.append(v)
+        entropy, penalty = batch_entropy(np.array(windows))
+        assert np.array_equal(entropy, [e for e, _ in expected])
+        assert np.array_equal(penalty, [p for _, p in expected])
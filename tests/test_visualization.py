@@ -0,0 +1,56 @@
+# tests/test_visualization.py
+import os
+
+import numpy as np
+import pytest
+
+from utils.timeseries import lttb_indices
+
+
+def test_lttb_indices_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 4321 in idx
+
+
+def test_lttb_indices_short_series_unchanged():
+    x = np.arange(50)
+    assert np.array_equal(lttb_indices(x, x * 2.0, 100), x)
+
+
+def _log(n_residents=2, n_ticks=5000):
+    rng = np.random.default_rng(0)
+    level = np.zeros((n_residents, n_ticks), dtype=np.int8)
+    level[:, 1000:1200] = 1
+    return {
+        "time": np.arange(1, n_ticks + 1),
+        "hr": 75 + rng.normal(0, 5, (n_residents, n_ticks)),
+        "entropy": rng.random((n_residents, n_ticks)) * 2,
+        "score": 60 + rng.random((n_residents, n_ticks)) * 30,
+        "level": level,
+    }
+
+
+def test_step_points_preserve_level_series():
+    pytest.importorskip("matplotlib")
+    from utils.visualization import Visualizer
+    log = _log(1)
+    t, level = Visualizer._step_points(log["time"], log["level"][0], max_points=100)
+    assert len(t) < 10
+    # 折线插值回原时间轴与原序列一致
+    assert np.array_equal(np.interp(log["time"], t, level), log["level"][0])
+
+
+def test_render_reports_serial(tmp_path):
+    pytest.importorskip("matplotlib")
+    from utils.visualization import render_reports
+    paths = render_reports(_log(), str(tmp_path), workers=1, dpi=40, max_points=500)
+    assert [os.path.basename(p) for p in paths] == ["resident_00000.png", "resident_00001.png"]
+    for p in paths:
+        with open(p, "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,112 @@
+# utils/dashboard.py
+"""
+Streamlit 仪表盘增量渲染层
+- 图表: 双 Y 轴 WebGL (Scattergl) 图对象只创建一次，没有新数据点时不重发
+- 地图: pydeck 图层只创建一次，仅在隐私框大小变化或中心明显移动时重绘 (忽略脱敏噪声)
+- 卡片: HTML 内容不变时跳过重绘
+- 节流: UI 刷新率独立于仿真时钟
+"""
+import math
+import time
+import plotly.graph_objects as go
+import pydeck as pdk
+from plotly.subplots import make_subplots
+
+class RefreshThrottle:
+    """UI 刷新节流器: 两次刷新间隔不小于 1/max_fps 秒"""
+    def __init__(self, max_fps=4.0):
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self._last = float("-inf")
+
+    def due(self, force=False):
+        now = time.perf_counter()
+        if force or now - self._last >= self.min_interval:
+            self._last = now
+            return True
+        return False
+
+
+class CachedMarkdown:
+    """只在 HTML 变化时重绘的占位符"""
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+        self._last = None
+
+    def markdown(self, html):
+        if html != self._last:
+            self.placeholder.markdown(html, unsafe_allow_html=True)
+            self._last = html
+
+
+class DualAxisChart:
+    """
+    双 Y 轴 WebGL 折线图
+    traces: [{"name": ..., "secondary_y": bool, 其余为 go.Scattergl 样式参数}, ...]
+    """
+    def __init__(self, placeholder, traces, height=280):
+        self.placeholder = placeholder
+        self.fig = make_subplots(specs=[[{"secondary_y": True}]])
+        for spec in traces:
+            spec = dict(spec)
+            secondary = spec.pop("secondary_y", False)
+            self.fig.add_trace(go.Scattergl(x=[], y=[], mode="lines", **spec), secondary_y=secondary)
+        self.fig.update_layout(height=height, margin=dict(l=0, r=0, t=10, b=0), template="plotly_dark",
+                               legend=dict(orientation="h", y=1.1), uirevision="keep")
+        self._last_x = None
+
+    def update(self, x, ys):
+        """x 与 ys (每条曲线一列) 为当前显示窗口；窗口末端没有新点时不重发"""
+        if len(x) == 0 or x[-1] == self._last_x:
+            return
+        with self.fig.batch_update():
+            for trace, y in zip(self.fig.data, ys):
+                trace.x = x
+                trace.y = y
+        self._last_x = x[-1]
+        self.placeholder.plotly_chart(self.fig, use_container_width=True)
+
+
+class PrivacyMap:
+    """
+    K-匿名隐私框地图: 图层只创建一次，匿名框实质变化时才重绘
+    - 框大小变化 (K 值/等级切换) 立即重绘
+    - 大小不变时，中心偏移超过 tolerance (度) 才重绘；tolerance 缺省为框的半宽/半高，
+      大于 PrivacyModule 每个时刻的随机中心噪声 (±半径/2，即相邻两帧最多相差一个半径)，噪声抖动不触发重绘
+    """
+    def __init__(self, placeholder, lat, lon, tolerance=None):
+        self.placeholder = placeholder
+        self.tolerance = tolerance
+        self._bbox = None
+
+        self.layer_box = pdk.Layer("PolygonLayer", data=[], get_polygon="coords",
+                                   get_fill_color=[0, 255, 100, 30], get_line_color=[0, 255, 100, 200],
+                                   get_line_width=3)
+        self.layer_pt = pdk.Layer("ScatterplotLayer", data=[{"lat": lat, "lon": lon}], get_position="[lon, lat]",
+                                  get_color=[255, 0, 0, 200], get_radius=20)
+        view_state = pdk.ViewState(latitude=lat, longitude=lon, zoom=14.5, pitch=30)
+        self.deck = pdk.Deck(layers=[self.layer_box, self.layer_pt], initial_view_state=view_state, map_style="dark")
+
+    def _same_cloak(self, bbox):
+        if self._bbox is None:
+            return False
+        old = self._bbox
+        half_w, half_h = (bbox[2] - bbox[0]) / 2, (bbox[3] - bbox[1]) / 2
+        if not (math.isclose(half_w, (old[2] - old[0]) / 2, rel_tol=1e-6) and
+                math.isclose(half_h, (old[3] - old[1]) / 2, rel_tol=1e-6)):
+            return False
+        tol_w = half_w if self.tolerance is None else self.tolerance
+        tol_h = half_h if self.tolerance is None else self.tolerance
+        return (abs((bbox[0] + bbox[2]) - (old[0] + old[2])) / 2 <= tol_w and
+                abs((bbox[1] + bbox[3]) - (old[1] + old[3])) / 2 <= tol_h)
+
+    def update(self, bbox):
+        bbox = [float(v) for v in bbox]
+        if self._same_cloak(bbox):
+            return
+        self._bbox = bbox
+        self.layer_box.data = [{"coords": [[
+            [bbox[0], bbox[1]], [bbox[2], bbox[1]],
+            [bbox[2], bbox[3]], [bbox[0], bbox[3]],
+            [bbox[0], bbox[1]]
+        ]]}]
+        self.placeholder.pydeck_chart(self.deck)
@@ -0,0 +1,94 @@
+# utils/seeding.py
+"""
+可复现的随机流
+(seed, 子系统, 老人编号) 唯一确定每位老人的随机序列，与社区规模、分片方式、运行顺序都无关
+- resident_generators: 每人一个 np.random.Generator，与 SeedSequence(seed).spawn(...)[子系统].spawn(...)[老人编号] 完全相同 (逐人接口)
+- ResidentStreams: 计数器式随机流，整个社区一次向量化生成 (群体接口)
+"""
+import numpy as np
+
+SUBSYSTEMS = ("vitals", "crowd", "privacy")
+
+def subsystem_seed(seed, subsystem):
+    """子系统级 SeedSequence (不区分老人时使用)"""
+    return np.random.SeedSequence(seed, spawn_key=(SUBSYSTEMS.index(subsystem),))
+
+def resident_generators(seed, subsystem, resident_ids):
+    """每位老人一个独立的 Generator，resident_ids 为全局编号 (分片时传入本分片的编号)"""
+    sub = SUBSYSTEMS.index(subsystem)
+    return [np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(sub, int(i))))
+            for i in resident_ids]
+
+
+# SplitMix64 常量
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+def _splitmix64(x):
+    """SplitMix64 终结函数 (x 为 uint64 数组，乘法按 2^64 回绕)"""
+    z = x ^ (x >> np.uint64(30))
+    z = z * _MIX1
+    z ^= z >> np.uint64(27)
+    z = z * _MIX2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+class ResidentStreams:
+    """
+    计数器式的逐人随机流: 第 i 位老人的第 c 个随机数 = SplitMix64(key_i + c·φ)
+    key_i 由 (seed, 子系统, 全局编号) 派生，与社区规模、分片方式无关；
+    所有老人共用同一计数器 (每次调用每人取相同个数)，整个社区一次向量化生成，不保存逐人缓冲
+    """
+    def __init__(self, seed, subsystem, resident_ids):
+        base = subsystem_seed(seed, subsystem).generate_state(1, np.uint64)
+        ids = np.asarray(resident_ids, dtype=np.uint64)
+        self.keys = _splitmix64(base + (ids + np.uint64(1)) * _GOLDEN)
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _uniform(self, rows, offsets):
+        """rows 位老人在 (当前计数器 + offsets) 处的 [0, 1) 均匀数 (rows/offsets 可广播)"""
+        counters = np.uint64(self.counter) + np.asarray(offsets, dtype=np.uint64)
+        z = _splitmix64(self.keys[rows] + counters * _GOLDEN)
+        return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def _tail(self, size):
+        if isinstance(size, (int, np.integer)):
+            return (int(size),)
+        if size[0] != len(self.keys):
+            raise ValueError(f"首维 {size[0]} 与随机流数量 {len(self.keys)} 不一致")
+        return tuple(size[1:])
+
+    def random(self, size=1):
+        """
+        [0, 1) 均匀随机数: size 为整数 k 时返回 (N, k)，为元组时须以 N 开头、返回该形状
+        第 i 行依次取自第 i 位老人的随机流
+        """
+        tail = self._tail(size)
+        m = int(np.prod(tail, dtype=np.int64))
+        out = self._uniform(np.arange(len(self.keys))[:, None], np.arange(m)[None, :])
+        self.counter += m
+        return out.reshape((len(self.keys),) + tail)
+
+    def normal(self, loc=0.0, scale=1.0, size=1, mask=None):
+        """
+        正态随机数 (Box-Muller，每个值消耗 2 个计数)
+        mask: 与 size 同形的布尔掩码，给定时只计算掩码内的值并返回一维数组 (顺序同 arr[mask])；
+              计数器仍按整块前进，因此每位老人的随机序列与其他老人的掩码无关
+        """
+        tail = self._tail(size)
+        n, m = len(self.keys), int(np.prod(tail, dtype=np.int64))
+        if mask is None:
+            rows, cols = np.arange(n)[:, None], np.arange(m)[None, :]
+        else:
+            rows, cols = np.nonzero(np.asarray(mask).reshape(n, m))
+        u1 = 1.0 - self._uniform(rows, 2 * cols)
+        u2 = self._uniform(rows, 2 * cols + 1)
+        z = np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+        self.counter += 2 * m
+        out = loc + scale * z
+        return out if mask is not None else out.reshape((n,) + tail)
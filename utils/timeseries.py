@@ -0,0 +1,188 @@
+# utils/timeseries.py
+"""
+仪表盘历史数据存储
+- 原始层: 预分配的 NumPy 环形缓冲，追加为 O(1)，最近 n 个点的窗口是零拷贝视图
+- 汇总层: 按更粗的分辨率保存每个桶的 min/mean/max，内存有界地保留数小时到数天的历史
+- 降采样: LTTB (Largest-Triangle-Three-Buckets)，保留峰谷形状，用于长序列绘图
+"""
+import numpy as np
+from config import HISTORY_CAPACITY, HISTORY_ROLLUPS
+
+class _Ring:
+    """
+    多列环形缓冲 (双写): 每个值同时写入 pos 与 pos+capacity，
+    因此任意"最近 n 个点"都是缓冲区中的一段连续切片，无需拼接或拷贝
+    """
+    def __init__(self, n_cols, capacity, dtype):
+        self.capacity = capacity
+        self._buf = np.zeros((n_cols, 2 * capacity), dtype=dtype)
+        self._pos = 0
+        self._len = 0
+
+    def push(self, row):
+        self._buf[:, self._pos] = row
+        self._buf[:, self._pos + self.capacity] = row
+        self._pos = (self._pos + 1) % self.capacity
+        self._len = min(self._len + 1, self.capacity)
+
+    def view(self, n=None):
+        n = self._len if n is None else min(n, self._len)
+        end = self._pos + self.capacity
+        return self._buf[:, end - n:end]
+
+    def __len__(self):
+        return self._len
+
+
+class _RollupTier:
+    """汇总层: 每 resolution 个原始点合并为一个桶，保存 min/mean/max"""
+    def __init__(self, resolution, capacity, n_cols, dtype):
+        self.resolution = resolution
+        self.min = _Ring(n_cols, capacity, dtype)
+        self.mean = _Ring(n_cols, capacity, dtype)
+        self.max = _Ring(n_cols, capacity, dtype)
+        self._acc_min = np.empty(n_cols, dtype=dtype)
+        self._acc_max = np.empty(n_cols, dtype=dtype)
+        self._acc_sum = np.zeros(n_cols, dtype=np.float64)
+        self._count = 0
+
+    def add(self, row):
+        if self._count == 0:
+            self._acc_min[:] = row
+            self._acc_max[:] = row
+            self._acc_sum[:] = row
+        else:
+            np.minimum(self._acc_min, row, out=self._acc_min)
+            np.maximum(self._acc_max, row, out=self._acc_max)
+            self._acc_sum += row
+        self._count += 1
+
+        if self._count == self.resolution:
+            self.min.push(self._acc_min)
+            self.mean.push(self._acc_sum / self.resolution)
+            self.max.push(self._acc_max)
+            self._count = 0
+
+    def partial(self, i):
+        """当前未满桶第 i 列的 (min, mean, max)，桶为空时返回 None"""
+        if self._count == 0:
+            return None
+        return self._acc_min[i], self._acc_sum[i] / self._count, self._acc_max[i]
+
+    @property
+    def span(self):
+        """该层最多覆盖的原始点数"""
+        return self.resolution * self.min.capacity
+
+
+class TimeSeriesStore:
+    """
+    多通道时间序列存储 (替代 dict + list.pop(0))
+    fields: 通道名列表，每次 append 必须提供全部通道
+    capacity: 原始层容量 (点数)
+    rollups: [(resolution, capacity), ...] 汇总层配置，resolution 为每个桶包含的原始点数
+
+    window()/rollup() 返回的是缓冲区视图，下一次 append 后内容会变化，需要保存时请自行 copy
+    (rollup() 包含未满的当前桶时返回副本)
+    时间通道的 mean 为桶中心时刻，min/max 为桶的起止时刻
+    """
+    def __init__(self, fields, capacity=HISTORY_CAPACITY, rollups=HISTORY_ROLLUPS, dtype=np.float64):
+        self.fields = tuple(fields)
+        self._index = {f: i for i, f in enumerate(self.fields)}
+        self._raw = _Ring(len(self.fields), capacity, dtype)
+        self.tiers = [_RollupTier(res, cap, len(self.fields), dtype)
+                      for res, cap in sorted(rollups)]
+        self._row = np.empty(len(self.fields), dtype=dtype)
+
+    def append(self, **values):
+        if len(values) != len(self.fields):
+            missing = set(self.fields) - set(values)
+            raise KeyError(f"缺少通道: {', '.join(sorted(missing))}" if missing else "存在未知通道")
+        for f, v in values.items():
+            self._row[self._index[f]] = v
+        self._raw.push(self._row)
+        for tier in self.tiers:
+            tier.add(self._row)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __getitem__(self, field):
+        return self.window(field)
+
+    @property
+    def capacity(self):
+        return self._raw.capacity
+
+    @property
+    def nbytes(self):
+        total = self._raw._buf.nbytes
+        for tier in self.tiers:
+            total += tier.min._buf.nbytes + tier.mean._buf.nbytes + tier.max._buf.nbytes
+        return total
+
+    def window(self, field, n=None):
+        """原始层最近 n 个点 (默认全部) 的零拷贝视图"""
+        return self._raw.view(n)[self._index[field]]
+
+    def rollup(self, tier, field, n=None, partial=True):
+        """
+        第 tier 个汇总层最近 n 个桶的 {"min", "mean", "max"}
+        partial=True 时末尾包含未满的当前桶 (按已到达的点汇总)，否则只含已完成的桶 (零拷贝视图)
+        """
+        t = self.tiers[tier]
+        i = self._index[field]
+        current = t.partial(i) if partial else None
+        if current is None or n == 0:
+            return {"min": t.min.view(n)[i], "mean": t.mean.view(n)[i], "max": t.max.view(n)[i]}
+        m = None if n is None else n - 1
+        views = (t.min.view(m)[i], t.mean.view(m)[i], t.max.view(m)[i])
+        return {key: np.append(v, c) for key, v, c in zip(("min", "mean", "max"), views, current)}
+
+    def series(self, field, span, time_field="time"):
+        """
+        绘制最近 span 个原始时刻的历史: 选择能覆盖 span 的最细分辨率
+        返回 {"time", "min", "mean", "max"}，原始层的 min/mean/max 为同一序列；
+        汇总层的最后一个点为未满的当前桶，最新数据不会因桶未满而延迟显示
+        """
+        if span <= self.capacity or not self.tiers:
+            values = self.window(field, span)
+            return {"time": self.window(time_field, span), "min": values, "mean": values, "max": values}
+
+        level = next((j for j, t in enumerate(self.tiers) if t.span >= span), len(self.tiers) - 1)
+        n = -(-span // self.tiers[level].resolution)
+        out = self.rollup(level, field, n)
+        out["time"] = self.rollup(level, time_field, n)["mean"]
+        return out
+
+
+def lttb_indices(x, y, n_out):
+    """
+    LTTB 降采样: 返回保留点的下标 (升序，含首尾)，len(x) <= n_out 时返回全部下标
+    中间点均分为 n_out-2 个桶，每桶选取与 "上一个已选点" 和 "下一桶均值点" 构成三角形面积最大的点
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.intp) + 1
+    edges[-1] = n - 1
+    # 各桶均值 (下一桶均值点)，最后一个桶之后是末点
+    csum_x = np.concatenate([[0.0], np.cumsum(x)])
+    csum_y = np.concatenate([[0.0], np.cumsum(y)])
+    counts = np.diff(edges)
+    avg_x = np.append((csum_x[edges[1:]] - csum_x[edges[:-1]]) / counts, x[-1])
+    avg_y = np.append((csum_y[edges[1:]] - csum_y[edges[:-1]]) / counts, y[-1])
+
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[b + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[b + 1] - ay))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
@@ -1,36 +1,77 @@
-import matplotlib.pyplot as plt
+import matplotlib
+import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.timeseries import lttb_indices
+
+def _pyplot(headless=False):
+    """导入 pyplot；headless 时先选定非交互后端 (Agg)，须在本进程首次导入 pyplot 之前调用才能生效"""
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
 
 class Visualizer:
-    def __init__(self):
+    def __init__(self, headless=False):
+        # 批处理 / 无显示环境使用非交互后端 (Agg)，只保存图片
+        self.plt = _pyplot(headless)
         # 设置绘图风格
         try:
-            plt.style.use('seaborn-v0_8-whitegrid')
+            self.plt.style.use('seaborn-v0_8-whitegrid')
         except:
-            plt.style.use('ggplot')
+            self.plt.style.use('ggplot')
 
-    def plot_dashboard(self, log):
+    @staticmethod
+    def _downsample(time, values, max_points):
+        """连续曲线用 LTTB 降采样 (保留峰谷)，max_points 为 None 时原样返回"""
+        if max_points is None or len(time) <= max_points:
+            return time, values
+        idx = lttb_indices(time, values, max_points)
+        return np.asarray(time)[idx], np.asarray(values)[idx]
+
+    @staticmethod
+    def _step_points(time, values, max_points):
+        """
+        阶梯曲线只保留首尾与每次取值变化前后的两个点:
+        阶梯线 (where='post') 与折线填充都与原序列绘制结果完全一致
+        """
+        values = np.asarray(values)
+        if max_points is None or len(values) <= max_points:
+            return time, values
+        change = np.flatnonzero(np.diff(values))
+        idx = np.unique(np.concatenate([[0], change, change + 1, [len(values) - 1]]))
+        return np.asarray(time)[idx], values[idx]
+
+    def plot_dashboard(self, log, save_path='simulation_result.png', show=True, dpi=300, max_points=None):
         """
         绘制论文/报告所需的三张关键图表
+        save_path: 输出路径 (None 不保存)；show: 是否弹出窗口 (批处理时为 False，绘制后关闭图形)
+        max_points: 长序列降采样后的最大点数 (None 为绘制全部原始点)
         """
+        plt = self.plt
         time = log['time']
-        
+        hr_t, hr = self._downsample(time, log['hr'], max_points)
+        ent_t, entropy = self._downsample(time, log['entropy'], max_points)
+        score_t, score = self._downsample(time, log['score'], max_points)
+        level_t, level = self._step_points(time, log['level'], max_points)
+
         fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
-        
+
         # Plot 1: Sensor Data & Entropy (展示对隐蔽风险的捕捉)
-        ax1.plot(time, log['hr'], color='#1f77b4', label='Heart Rate (Sensor)', alpha=0.7)
+        ax1.plot(hr_t, hr, color='#1f77b4', label='Heart Rate (Sensor)', alpha=0.7)
         ax1.set_ylabel('Heart Rate (bpm)')
         ax1.set_title('A. 4D Perception: Temporal Sensor Data vs. Information Entropy')
         ax1.legend(loc='upper left')
-        
+
         ax1_twin = ax1.twinx()
-        ax1_twin.plot(time, log['entropy'], color='#ff7f0e', label='Shannon Entropy', linewidth=2)
-        ax1_twin.fill_between(time, 0, log['entropy'], color='#ff7f0e', alpha=0.1)
+        ax1_twin.plot(ent_t, entropy, color='#ff7f0e', label='Shannon Entropy', linewidth=2)
+        ax1_twin.fill_between(ent_t, 0, entropy, color='#ff7f0e', alpha=0.1)
         ax1_twin.set_ylabel('Entropy (Bits)')
         ax1_twin.legend(loc='upper right')
 
         # Plot 2: Health Score & Thresholds (展示评分逻辑)
-        ax2.plot(time, log['score'], color='#2ca02c', label='Health Score ($H_{score}$)', linewidth=2)
+        ax2.plot(score_t, score, color='#2ca02c', label='Health Score ($H_{score}$)', linewidth=2)
         ax2.axhline(y=60, color='red', linestyle='--', label='Emergency Threshold (<60)')
         ax2.set_ylabel('Score (0-100)')
         ax2.set_ylim(30, 100)
@@ -39,18 +80,50 @@ class Visualizer:
 
         # Plot 3: Decision Level (展示迟滞比较器效果)
         # 将 0/1 转换为 L3/L4 标签
-        ax3.step(time, log['level'], where='post', color='#d62728', linewidth=2)
+        ax3.step(level_t, level, where='post', color='#d62728', linewidth=2)
         ax3.set_yticks([0, 1])
         ax3.set_yticklabels(['L3 (Monitor)', 'L4 (Emergency)'])
         ax3.set_ylabel('Care Level')
         ax3.set_xlabel('Simulation Time Step')
         ax3.set_title('C. Decision Making: Hysteresis Comparator Output')
-        ax3.fill_between(time, log['level'], color='#d62728', alpha=0.2)
+        ax3.fill_between(level_t, level, color='#d62728', alpha=0.2)
 
         plt.tight_layout()
-        
+
         # 保存图片用于报告
-        save_path = 'simulation_result.png'
-        plt.savefig(save_path, dpi=300)
-        print(f"Figure saved to {os.path.abspath(save_path)}")
-        plt.show()
\ No newline at end of file
+        if save_path is not None:
+            plt.savefig(save_path, dpi=dpi)
+            if show:
+                print(f"Figure saved to {os.path.abspath(save_path)}")
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
+        return save_path
+
+
+def _render_one(job):
+    """工作进程: 非交互后端绘制一位老人的报告"""
+    log, save_path, dpi, max_points = job
+    Visualizer(headless=True).plot_dashboard(log, save_path, show=False, dpi=dpi, max_points=max_points)
+    return save_path
+
+
+def render_reports(log, out_dir, residents=None, workers=None, dpi=150, max_points=2000, fmt="png"):
+    """
+    批量报告: log 为批处理日志 ({"time": (T,), 其余字段: (N, T)})，
+    在 workers 个进程中并行绘制所选老人 (缺省为全部) 的报告，输出到 out_dir/resident_XXXXX.<fmt>
+    workers=1 时在当前进程串行绘制；返回输出路径列表
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    n = len(log['hr'])
+    residents = range(n) if residents is None else residents
+    jobs = [
+        ({k: v if k == 'time' else v[i] for k, v in log.items()},
+         os.path.join(out_dir, f"resident_{i:05d}.{fmt}"), dpi, max_points)
+        for i in residents
+    ]
+    if workers == 1:
+        return [_render_one(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_one, jobs))